@@ -13,9 +13,18 @@ import re
 import json
 import time
 import logging
-from typing import Dict, Optional
-import requests
-from requests.exceptions import RequestException
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from common import state
+from common.due import DueIndex
+from common.extract import Field, PageSchema
+from common.http_pool import account_session, host_of
+from common.metrics import RunMetrics
+from common.notify_spool import NotifySpool
+from common.page_cache import fingerprint
+from common.retry import CircuitBreaker, RetryPolicy
+from common.stats_history import StatsHistory, parse_number
 
 # 配置日志
 logging.basicConfig(
@@ -26,101 +35,114 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 JSON_FILE_NAME = 'FN_attendance.json'
+CIRCUIT_FILE = 'FN_circuit.json'
+DUE_FILE = 'FN_attendance.due'
+# 签名缓存有效期（秒），过期或签到未成功时重新获取
+SIGN_TTL = int(os.getenv('FN_SIGN_TTL', str(7 * 24 * 3600)))
+SIGNED_MARK = '今日已打卡'
+# 并发签到的账号数量上限
+MAX_WORKERS = max(1, int(os.getenv('FN_MAX_WORKERS', '4')))
+# PV_COOKIE 中多个账号 Cookie 的分隔符
+ACCOUNT_SEPARATOR = re.compile(r'[&\n]')
 BASIC_URL = 'https://club.fnnas.com/plugin.php?id=zqlj_sign'
 DEFAULT_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
-class RetryDecorator:
-    """重试装饰器类"""
-    def __init__(self, max_retries=3, delay=1):
-        self.max_retries = max_retries
-        self.delay = delay
-
-    def __call__(self, func):
-        def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < self.max_retries:
-                try:
-                    logger.info(f'Attempt {retries+1}/{self.max_retries}')
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    logger.warning(f'Operation failed: {str(e)}')
-                    retries += 1
-                    time.sleep(self.delay)
-            raise Exception(f"Operation failed after {self.max_retries} attempts")
-        return wrapper
+# 打卡详情字段
+DETAILS_SCHEMA = PageSchema({
+    'recently_attendance': Field(r'最近打卡：(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', default=None),
+    'month_attendance_times': Field(r'本月打卡：(\d+)', default=None),
+    'continue_attendance_times': Field(r'连续打卡：(\d+)', default=None),
+    'total_attendance_times': Field(r'累计打卡：(\d+)', default=None),
+    'total_reward': Field(r'累计奖励：(\d+)', default=None),
+    'recently_reward': Field(r'最近奖励：(\d+)', default=None),
+    'level': Field(r'当前打卡等级：(.+?)</li>', default=None),
+})
+
+# 入库的数值指标
+HISTORY_METRICS = (
+    'month_attendance_times', 'continue_attendance_times',
+    'total_attendance_times', 'total_reward', 'recently_reward',
+)
+HISTORY = StatsHistory()
+
+METRICS = RunMetrics('fn')
+SPOOL = NotifySpool()
+BREAKER = CircuitBreaker(CIRCUIT_FILE)
+# 签名缺失、签到校验失败等 ValueError 同样重试
+RETRY_POLICY = RetryPolicy(max_retries=3, base_delay=1,
+                           retry_on=(ValueError,), breaker=BREAKER,
+                           on_retry=METRICS.record_retry)
 
 class FNClient:
     """飞牛论坛签到客户端"""
-    def __init__(self, cookie: str):
+    def __init__(self, cookie: str, sign: Optional[str] = None):
         if not cookie:
             raise ValueError("Cookie cannot be empty")
         
-        self.session = requests.Session()
+        self.session = account_session(BASIC_URL, fingerprint(cookie))
         self.session.headers.update(DEFAULT_HEADERS)
         self.session.headers.update({'Cookie': cookie})
-        self.sign: Optional[str] = None
+        self.sign = sign
+        self.already_signed = False
+        self.host = host_of(BASIC_URL)
+        self.timeout = 10
 
-    @RetryDecorator(max_retries=3)
-    def fetch_sign(self) -> None:
-        """获取签到签名"""
-        response = self.session.get(BASIC_URL)
+    def _get(self, url: str) -> str:
+        response = self.session.get(url, timeout=self.timeout)
         response.raise_for_status()
-        
-        if match := re.search(r'sign=([A-Za-z0-9]+)', response.text):
+        return response.text
+
+    @RETRY_POLICY
+    def fetch_sign(self) -> Optional[Dict]:
+        """获取签到签名，今日已打卡时直接返回签到详情"""
+        html = self._get(BASIC_URL)
+        if SIGNED_MARK in html:
+            self.already_signed = True
+            return self._parse_attendance_details(html)
+
+        if match := re.search(r'sign=([A-Za-z0-9]+)', html):
             self.sign = match.group(1)
             logger.info(f'Sign acquired: {self.sign}')
-        else:
-            raise ValueError("Sign parameter not found in response")
+            return None
+        raise ValueError("Sign parameter not found in response")
 
-    @RetryDecorator(max_retries=3)
-    def perform_attendance(self) -> Dict:
-        """执行签到操作"""
+    @RETRY_POLICY
+    def perform_attendance(self) -> Optional[Dict]:
+        """执行签到操作，签到响应中确认已打卡时返回签到详情，否则返回 None"""
         if not self.sign:
             raise ValueError("Sign not initialized")
 
         sign_url = f'{BASIC_URL}&sign={self.sign}'
         logger.debug(f'Sign URL: {sign_url}')
-        
-        # 执行签到请求
-        response = self.session.get(sign_url)
-        response.raise_for_status()
+        html = self._get(sign_url)
+        if SIGNED_MARK not in html:
+            return None
+        return self._parse_attendance_details(html)
 
-        # 验证签到结果
-        verify_response = self.session.get(BASIC_URL)
-        verify_response.raise_for_status()
-
-        if '今日已打卡' not in verify_response.text:
+    @RETRY_POLICY
+    def verify_attendance(self) -> Dict:
+        """签到响应中没有结果时，重新获取页面确认"""
+        html = self._get(BASIC_URL)
+        if SIGNED_MARK not in html:
             raise ValueError("Attendance verification failed")
-
-        return self._parse_attendance_details(verify_response.text)
+        return self._parse_attendance_details(html)
 
     @staticmethod
     def _parse_attendance_details(html: str) -> Dict:
         """解析签到详情"""
-        patterns = {
-            'recently_attendance': r'最近打卡：(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})',
-            'month_attendance_times': r'本月打卡：(\d+)',
-            'continue_attendance_times': r'连续打卡：(\d+)',
-            'total_attendance_times': r'累计打卡：(\d+)',
-            'total_reward': r'累计奖励：(\d+)',
-            'recently_reward': r'最近奖励：(\d+)',
-            'level': r'当前打卡等级：(.+?)</li>'
+        return {
+            key: value for key, value in DETAILS_SCHEMA.extract(html).items()
+            if value is not None
         }
 
-        details = {}
-        for key, pattern in patterns.items():
-            if match := re.search(pattern, html):
-                details[key] = match.group(1)
-        return details
-
 class AttendanceManager:
-    """签到状态管理器"""
+    """签到状态管理器，按账号记录"""
     @staticmethod
-    def init_data_file() -> Dict:
-        """初始化数据文件"""
-        default_data = {
+    def default_account() -> Dict:
+        """单个账号的初始记录"""
+        return {
             'last_attendance': '0000-00-00',
             'info': {
                 'recently_attendance': None,
@@ -133,71 +155,162 @@ class AttendanceManager:
             }
         }
 
+    @staticmethod
+    def load() -> Dict:
+        """读取签到记录，旧版单账号记录迁移为账号 1"""
+        data = state.load_json(JSON_FILE_NAME)
+        if data is None:
+            return {'accounts': {}}
+        if 'accounts' not in data:
+            data = {'accounts': {'1': data}}
+        return data
+
+    @staticmethod
+    def save(data: Dict) -> None:
+        """保存签到记录"""
         try:
-            if not os.path.exists(JSON_FILE_NAME):
-                with open(JSON_FILE_NAME, 'w', encoding='utf-8') as f:
-                    json.dump(default_data, f, indent=2)
-            return default_data
+            state.save_json(JSON_FILE_NAME, data, indent=2, ensure_ascii=False)
         except IOError as e:
-            logger.error(f"File operation failed: {str(e)}")
-            return default_data
+            logger.error(f"Failed to update record: {str(e)}")
 
     @staticmethod
-    def update_record(details: Dict) -> None:
-        """更新签到记录"""
+    def cached_sign(record: Dict, cookie: str) -> Optional[str]:
+        """读取同一 Cookie 未过期的签名缓存"""
+        cache = record.get('sign_cache') or {}
+        if cache.get('cookie') != fingerprint(cookie):
+            return None
+        if time.time() - cache.get('fetched_at', 0) >= SIGN_TTL:
+            return None
+        return cache.get('sign')
+
+    @staticmethod
+    def update_record(record: Dict, account: str, details: Dict,
+                      sign_cache: Optional[Dict] = None) -> None:
+        """更新账号的签到记录并写入历史数据"""
+        record['last_attendance'] = time.strftime('%Y-%m-%d')
+        record['info'].update(details)
+        if sign_cache:
+            record['sign_cache'] = sign_cache
+
         try:
-            with open(JSON_FILE_NAME, 'r+', encoding='utf-8') as f:
-                data = json.load(f)
-                data['last_attendance'] = time.strftime('%Y-%m-%d')
-                data['info'].update(details)
-                f.seek(0)
-                json.dump(data, f, indent=2)
-                f.truncate()
-        except (IOError, json.JSONDecodeError) as e:
-            logger.error(f"Failed to update record: {str(e)}")
+            HISTORY.record('FN', account, {
+                key: parse_number(details.get(key)) for key in HISTORY_METRICS
+            })
+        except Exception as e:
+            logger.error(f"Failed to record history: {str(e)}")
+
+
+def load_accounts() -> List[Tuple[str, str]]:
+    """读取 PV_COOKIE 中的账号，多个 Cookie 用 & 或换行分隔，账号依次编号为 1、2……"""
+    cookies = [
+        cookie.strip()
+        for cookie in ACCOUNT_SEPARATOR.split(os.getenv('PV_COOKIE', ''))
+        if cookie.strip()
+    ]
+    return [(str(i), cookie) for i, cookie in enumerate(cookies, 1)]
+
+
+def check_in_account(account: str, cookie: str, cached_sign: Optional[str]) -> Tuple[Dict, FNClient]:
+    """单个账号签到，返回（签到详情，客户端）"""
+    client = FNClient(cookie, sign=cached_sign)
+    details = None
+    # 先用缓存的签名直接签到，一次请求即可完成
+    if cached_sign:
+        details = METRICS.call(account, 'perform_attendance', client.perform_attendance)
+        if details is None:
+            logger.info(f"账号{account}: 缓存的签名已失效，重新获取")
+    if details is None:
+        details = METRICS.call(account, 'fetch_sign', client.fetch_sign)
+    if details is None:
+        details = METRICS.call(account, 'perform_attendance', client.perform_attendance) \
+            or METRICS.call(account, 'verify_attendance', client.verify_attendance)
+    return details, client
+
+
+def account_report(account: str, details: Dict, already_signed: bool) -> str:
+    """生成单个账号的报告"""
+    title = "今日已签到" if already_signed else "签到成功"
+    return (
+        f"<h1>账号{account} {title}</h1><hr>"
+        f"打卡时间：{details.get('recently_attendance')}<br>"
+        f"本月打卡：{details.get('month_attendance_times')}天<br>"
+        f"连续打卡：{details.get('continue_attendance_times')}天<br>"
+        f"累计打卡：{details.get('total_attendance_times')}天<br>"
+        f"累计奖励：{details.get('total_reward')}飞牛币<br>"
+        f"最近奖励：{details.get('recently_reward')}飞牛币<br>"
+        f"当前等级：{details.get('level')}<br>"
+    )
+
 
 def main():
     """主执行流程"""
-    AttendanceManager.init_data_file()
-    
+    accounts = load_accounts()
+    if not accounts:
+        logger.error("未找到环境变量 PV_COOKIE")
+        return
+
+    # 先查待办索引，今日已签到时不读取状态、不联网
+    due = DueIndex(DUE_FILE)
+    account_ids = [account for account, _ in accounts]
+    if due.is_idle(account_ids):
+        logger.info("今日已签到，无需重复操作")
+        SPOOL.flush()
+        return
+
+    METRICS.reset()
     try:
-        with open(JSON_FILE_NAME, 'r', encoding='utf-8') as f:
-            record = json.load(f)
+        data = AttendanceManager.load()
     except (IOError, json.JSONDecodeError) as e:
         logger.error(f"Failed to load records: {str(e)}")
         return
 
-    if record['last_attendance'] == time.strftime('%Y-%m-%d'):
-        logger.info("今日已签到，无需重复操作")
-        return
+    today = time.strftime('%Y-%m-%d')
+    records = data['accounts']
+    pending = []
+    for account, cookie in accounts:
+        record = records.setdefault(account, AttendanceManager.default_account())
+        if record['last_attendance'] == today:
+            logger.info(f"账号{account}: 今日已签到，无需重复操作")
+            continue
+        pending.append((account, cookie, AttendanceManager.cached_sign(record, cookie)))
 
-    cookie = os.getenv('PV_COOKIE')
-    if not cookie:
-        logger.error("未找到环境变量 PV_COOKIE")
+    if not pending:
+        due.save(account_ids)
+        SPOOL.flush()
         return
 
-    try:
-        client = FNClient(cookie)
-        client.fetch_sign()
-        details = client.perform_attendance()
-        AttendanceManager.update_record(details)
-        
-        report = (
-            "<h1>签到成功</h1><hr>"
-            f"打卡时间：{details['recently_attendance']}<br>"
-            f"本月打卡：{details['month_attendance_times']}天<br>"
-            f"连续打卡：{details['continue_attendance_times']}天<br>"
-            f"累计打卡：{details['total_attendance_times']}天<br>"
-            f"累计奖励：{details['total_reward']}飞牛币<br>"
-            f"最近奖励：{details['recently_reward']}飞牛币<br>"
-            f"当前等级：{details['level']}"
-        )
-        
-        QLAPI.notify("飞牛论坛签到报告", report)
+    # 各账号使用独立的连接池并发签到，结果按账号顺序合并
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(check_in_account, account, cookie, cached_sign)
+            for account, cookie, cached_sign in pending
+        ]
+
+    reports = []
+    for (account, cookie, cached_sign), future in zip(pending, futures):
+        try:
+            details, client = future.result()
+        except Exception as e:
+            logger.error(f"账号{account}: 签到流程失败: {str(e)}")
+            reports.append(f'<h1 style="color:red">账号{account} 签到失败</h1><hr>')
+            continue
+
+        sign_cache = None
+        if client.sign and client.sign != cached_sign:
+            sign_cache = {'sign': client.sign, 'cookie': fingerprint(cookie),
+                          'fetched_at': time.time()}
+        AttendanceManager.update_record(records[account], account, details, sign_cache)
+        report = account_report(account, details, client.already_signed)
+        reports.append(report)
         logger.info(report.replace('<br>', '\n'))
 
-    except Exception as e:
-        logger.error(f"签到流程失败: {str(e)}")
+    AttendanceManager.save(data)
+    due.save([account for account in account_ids
+              if records[account]['last_attendance'] == today])
+    BREAKER.save()
+    METRICS.export()
+    SPOOL.put("飞牛论坛签到报告", ''.join(reports), source='fn')
+    SPOOL.flush()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,6 +3,27 @@
 """
 PT站点签到脚本
 
+## 20261017
+    优化内容：
+    1. 多站点并发签到（PT_MAX_WORKERS 控制并发数，默认4），签到页与首页并发获取
+    2. 同一站点复用 keep-alive 连接池（PT_POOL_SIZE 控制连接数，默认10）
+    3. 重试改为指数退避+抖动，仅重试可恢复的网络异常，站点连续失败后熔断跳过
+    4. 页面字段改为预编译的声明式提取，站点可通过 attendance_schema/index_schema 自定义
+    5. 新增流式读取模式（PT_STREAM=1），所需字段全部命中后停止下载，并记录节省的流量
+    6. 首页信息缓存到 PT_index_cache.json，TTL（PT_INDEX_TTL，默认3600秒）内直接复用，
+       过期后使用 ETag/Last-Modified 条件请求
+    7. 每次签到后的分享率、上传/下载量、魔力值等写入 stats_history.db，保留历史趋势
+    8. 按站点统计建连、签到页、首页、解析、重试耗时及结果，导出 pt_metrics.prom/pt_metrics.json
+    9. 启动时先读取 PT_attendance.due，所有站点今日已签到时直接退出，不联网、不写文件
+    10. 支持同一站点多账号：环境变量中的多个 Cookie 用 & 或换行分隔，
+        Cookie 前可加 label=名称; 固定账号标识（站点名#名称），未加时第一个账号沿用站点名，
+        其余按 Cookie 指纹记为 站点名#指纹前8位，增删、调整账号顺序不影响其他账号的记录
+        同一站点的账号共享连接池，同时签到的账号数由 PT_HOST_WORKERS 控制（默认2）
+    11. 报告先写入本地通知队列 notify_spool.jsonl 再推送，推送失败时下次运行退避重试
+    12. 按站点记录已推送公告的指纹（最多 NOTICE_HISTORY 条），只保存和推送新公告
+    13. 按主机令牌桶限流（PT_HOST_RPS/PT_HOST_BURST/PT_HOST_CONCURRENCY），等待时间计入运行指标
+    14. 识别登录页，Cookie 失效的账号按 Cookie 指纹隔离并只提醒一次，环境变量更新后自动恢复
+
 ## 20250730
     新增站点：
     1. btschool.club
@@ -30,11 +51,46 @@ new Env('PT签到');
 
 import os
 import re
-import requests
 import time
-import json
-from functools import wraps
-
+import codecs
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from common import state
+from common.due import DueIndex
+from common.extract import Field, PageSchema, StreamExtractor, strip_spaces
+from common.http_pool import get_session, host_of, host_semaphore, response_charset
+from common.metrics import RunMetrics
+from common.notify_spool import NotifySpool
+from common.page_cache import PageCache, fingerprint
+from common.rate_limit import HostRateLimiter
+from common.stats_history import StatsHistory, parse_number, parse_size
+from common.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+# NexusPHP 签到页字段
+NEXUSPHP_ATTENDANCE = PageSchema({
+    'times': Field(r'这是您的第.*?(\d+)', int),
+    'continue': Field(r'已连续签到.*?(\d+)', int),
+    'reward': Field(r'本次签到获得.*?(\d+)', int),
+    'retroactive_cards': Field(r'目前拥有补签卡.*?(\d+)', int),
+    'today_rank': Field(r'今日签到排名：<b>(\d+)</b> / <b>(\d+)</b>',
+                        '/'.join, default='N/A/N/A'),
+}, marker='欢迎回来')
+
+# NexusPHP 首页字段
+NEXUSPHP_INDEX = PageSchema({
+    'share_ratio': Field(r'分享率.*?(\d+\.\d+)'),
+    'upload_count': Field(r'上传量:</font>(.*?)<', strip_spaces),
+    'download_count': Field(r'下载量:</font>(.*?)<', strip_spaces),
+    'ml_count': Field(r'使用</a>]:(.*?)<', strip_spaces),
+    'mails': Field(r'(\d+) 新', int),
+    'notices': Field(r'(\d{4}\.\d{2}\.\d{2}) - <b>(.*?)</b>', many=True),
+}, marker='欢迎回来')
+
+# NexusPHP 登录页特征，页面缺少 marker 且命中时判定 Cookie 失效
+NEXUSPHP_LOGIN = re.compile(r'takelogin\.php|<input[^>]+name=["\']password["\']')
 
 PT = {
     'ICC2022': {
@@ -84,34 +140,81 @@ PT = {
     }
 }
 
+# 并发签到的账号数量上限
+MAX_WORKERS = max(1, int(os.getenv('PT_MAX_WORKERS', '4')))
+# 同一站点同时签到的账号数量上限
+HOST_WORKERS = max(1, int(os.getenv('PT_HOST_WORKERS', '2')))
+# 同一环境变量中多个账号 Cookie 的分隔符
+ACCOUNT_SEPARATOR = re.compile(r'[&\n]')
+# Cookie 前可选的账号名称：label=名称;
+ACCOUNT_LABEL = re.compile(r'label=([^;#]+);\s*')
+# 每个站点连接池的连接数
+POOL_SIZE = max(1, int(os.getenv('PT_POOL_SIZE', '10')))
+# 流式读取页面，字段全部命中后停止下载（公告仅包含已读取部分）
+STREAM = os.getenv('PT_STREAM', '0') == '1'
+STREAM_CHUNK_SIZE = 16 * 1024
+# 首页信息缓存
+INDEX_CACHE = PageCache(
+    'PT_index_cache.json', ttl=int(os.getenv('PT_INDEX_TTL', '3600'))
+)
+
+
+# 每个站点保留的已推送公告指纹数
+NOTICE_HISTORY = 100
+
+# 当天已完成站点的索引
+DUE_FILE = 'PT_attendance.due'
+
+# 账号数据历史
+HISTORY = StatsHistory()
+
+# 运行指标
+METRICS = RunMetrics('pt')
+
+# 通知队列
+SPOOL = NotifySpool()
+
+# 按主机限流：每秒请求数、突发请求数、同时进行的请求数，同一进程内所有账号共享
+RATE_LIMITER = HostRateLimiter(
+    rate=float(os.getenv('PT_HOST_RPS', '2')),
+    burst=int(os.getenv('PT_HOST_BURST', '4')),
+    concurrency=int(os.getenv('PT_HOST_CONCURRENCY', '4')),
+    on_wait=METRICS.record_rate_wait,
+)
 
-def retry(max_retries=3, delay=1, exceptions=(Exception,)):
-    """装饰器：重试失败的函数调用"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
-                try:
-                    return func(*args, **kwargs)
-                except exceptions as e:
-                    print(f"异常捕获: {e.__class__.__name__}: {e}. 重试中...")
-                    retries += 1
-                    time.sleep(delay)
-            raise Exception(f"重试{max_retries}次后失败")
-        return wrapper
-    return decorator
+# 站点熔断状态文件
+CIRCUIT_FILE = 'PT_circuit.json'
+BREAKER = CircuitBreaker(CIRCUIT_FILE)
+RETRY_POLICY = RetryPolicy(max_retries=3, base_delay=1, breaker=BREAKER,
+                           on_retry=METRICS.record_retry)
+
+
+class LoginRequiredError(Exception):
+    """Cookie 失效，站点返回登录页"""
 
 
 class PTClient:
     """PT站点客户端"""
     
-    def __init__(self, cookie, attendance_url, index_url):
+    def __init__(self, cookie, attendance_url, index_url,
+                 attendance_schema=NEXUSPHP_ATTENDANCE,
+                 index_schema=NEXUSPHP_INDEX, stream=STREAM,
+                 cache=None, name=None, login_pattern=NEXUSPHP_LOGIN):
+        self.name = name or host_of(index_url)  # 用于缓存和指标
         self.cookie = cookie
         self.attendance_url = attendance_url
         self.index_url = index_url
+        self.attendance_schema = attendance_schema
+        self.index_schema = index_schema
+        self.stream = stream
+        self.cache = cache
+        self.login_pattern = login_pattern
+        self.traffic = {'bytes_read': 0, 'bytes_saved': 0}
+        self._traffic_lock = threading.Lock()
         self.headers = self._init_headers()
         self.timeout = 10  # 请求超时时间
+        self.host = host_of(index_url)
+        self.session = get_session(index_url, POOL_SIZE)
 
     def _init_headers(self):
         """初始化请求头"""
@@ -126,93 +229,128 @@ class PTClient:
                           'Chrome/132.0.0.0 Safari/537.36')
         }
 
-    @retry(max_retries=3, delay=1)
+    @RETRY_POLICY
     def attendance(self):
         """获取签到信息"""
-        try:
-            response = requests.get(
-                self.attendance_url, 
-                headers=self.headers, 
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            
-            attendance_detail = {'status': False}
-            if '欢迎回来' in response.text:
-                attendance_detail.update({
-                    'status': True,
-                    'times': self._safe_re_search(
-                        r'这是您的第.*?(\d+)', response.text
-                    ),
-                    'continue': self._safe_re_search(
-                        r'已连续签到.*?(\d+)', response.text
-                    ),
-                    'reward': self._safe_re_search(
-                        r'本次签到获得.*?(\d+)', response.text
-                    ),
-                    'retroactive_cards': self._safe_re_search(
-                        r'目前拥有补签卡.*?(\d+)', response.text
-                    ),
-                    'today_rank': self._safe_re_rank(response.text),
-                })
-            return attendance_detail
-        except requests.RequestException as e:
-            print(f"请求异常: {str(e)}")
-            return {'status': False}
+        return self._fetch(
+            self.attendance_url, self.attendance_schema, 'attendance_fetch'
+        )[0]
 
-    @retry(max_retries=3, delay=1)
+    @RETRY_POLICY
     def index_info(self):
-        """获取首页信息"""
-        try:
-            response = requests.get(
-                self.index_url,
-                headers=self.headers,
+        """获取首页信息，缓存未过期时直接返回缓存"""
+        entry = self.cache.get(self.name, self.cookie) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            return entry['data']
+
+        basic_info, response = self._fetch(
+            self.index_url, self.index_schema, 'index_fetch',
+            PageCache.validators(entry)
+        )
+        if response.status_code == 304 and entry:
+            self.cache.touch(self.name)
+            return entry['data']
+        if self.cache and basic_info['status']:
+            self.cache.put(self.name, self.cookie,
+                           basic_info, response.headers)
+        return basic_info
+
+    def _fetch(self, url, schema, phase, extra_headers=None):
+        """获取页面并提取字段，返回（提取结果，响应）"""
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
+        if self.stream:
+            with RATE_LIMITER.slot(url), METRICS.timer(self.name, phase):
+                fields, text, response = self._fetch_stream(url, schema, headers)
+            # 未命中字段时页面已读完，可按跳转地址和登录表单判断
+            if fields is None and response.status_code != 304:
+                self._check_login(response, text)
+            return self._wrap(fields), response
+
+        with RATE_LIMITER.slot(url), METRICS.timer(self.name, phase):
+            response = self.session.get(
+                url,
+                headers=headers,
                 timeout=self.timeout
             )
             response.raise_for_status()
-            
-            basic_info = {'status': False}
-            if '欢迎回来' in response.text:
-                basic_info.update({
-                    'status': True,
-                    'share_ratio': self._safe_re_search(
-                        r'分享率.*?(\d+\.\d+)', response.text
-                    ),
-                    'upload_count': self._safe_re_search(
-                        r'上传量:</font>(.*?)<', response.text, cleanup=True
-                    ),
-                    'download_count': self._safe_re_search(
-                        r'下载量:</font>(.*?)<', response.text, cleanup=True
-                    ),
-                    'ml_count': self._safe_re_search(
-                        r'使用</a>]:(.*?)<', response.text, cleanup=True
-                    ),
-                    'mails': self._safe_re_search(
-                        r'(\d+) 新', response.text
-                    ),
-                    'notices': re.findall(
-                        r'(\d{4}\.\d{2}\.\d{2}) - <b>(.*?)</b>', response.text
-                    )
-                })
-            return basic_info
-        except requests.RequestException as e:
-            print(f"请求异常: {str(e)}")
-            return {'status': False}
-
-    @staticmethod
-    def _safe_re_search(pattern, text, group=0, cleanup=False):
-        """安全的正则搜索，防止异常"""
-        match = re.findall(pattern, text)
-        if match:
-            result = match[0] if isinstance(match, list) else match
-            return result.replace(' ', '') if cleanup else result
-        return 'N/A'
+            if response.status_code == 304:
+                return {'status': False}, response
+            text = response.text
+
+        with METRICS.timer(self.name, 'parse'):
+            info = self._parse(schema, text)
+        if not info['status']:
+            self._check_login(response, text)
+        return info, response
+
+    def _check_login(self, response, text=''):
+        """跳转到登录页或页面带登录表单时抛出 LoginRequiredError"""
+        if 'login.php' in urlsplit(response.url).path or \
+                (self.login_pattern and self.login_pattern.search(text)):
+            raise LoginRequiredError(f'{self.name}: Cookie 已失效')
+
+    def _fetch_stream(self, url, schema, headers):
+        """流式获取页面，标志文本和字段全部命中后提前断开，返回（提取结果，已读取文本，响应）"""
+        response = self.session.get(
+            url,
+            headers=headers,
+            timeout=self.timeout,
+            stream=True
+        )
+        try:
+            response.raise_for_status()
+            if response.status_code == 304:
+                return None, '', response
+            decoder = codecs.getincrementaldecoder(
+                response_charset(response)
+            )(errors='replace')
+            extractor = StreamExtractor(schema)
+            bytes_read, complete = 0, False
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                bytes_read += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if extractor.done:
+                    break
+            else:
+                extractor.feed(decoder.decode(b'', final=True), final=True)
+                complete = True
+            self._record_traffic(response, bytes_read, complete)
+        finally:
+            response.close()
+        return extractor.result(), extractor.text, response
+
+    def _record_traffic(self, response, bytes_read, complete):
+        """记录读取的页面字节数和提前断开节省的字节数
+
+        分块或压缩传输时页面总大小未知，节省量记为 None。
+        """
+        if complete:
+            saved = 0
+        else:
+            length = response.headers.get('Content-Length')
+            # 压缩传输时 Content-Length 为压缩后大小，与读取的字节数不可比
+            if length and not response.headers.get('Content-Encoding'):
+                saved = max(0, int(length) - bytes_read)
+            else:
+                saved = None
+        with self._traffic_lock:
+            self.traffic['bytes_read'] += bytes_read
+            if saved is None or self.traffic['bytes_saved'] is None:
+                self.traffic['bytes_saved'] = None
+            else:
+                self.traffic['bytes_saved'] += saved
+
+    @classmethod
+    def _parse(cls, schema, text):
+        """按页面声明提取字段"""
+        return cls._wrap(schema.extract(text))
 
     @staticmethod
-    def _safe_re_rank(text):
-        """获取排名信息"""
-        match = re.search(r'今日签到排名：<b>(\d+)</b> / <b>(\d+)</b>', text)
-        return '/'.join(match.groups()) if match else 'N/A/N/A'
+    def _wrap(fields):
+        """附加状态标识，未登录页面返回失败"""
+        if fields is None:
+            return {'status': False}
+        return {'status': True, **fields}
 
 
 def init_json_file():
@@ -220,8 +358,8 @@ def init_json_file():
     default_data = {
         'total': len(PT),
         'enables': [
-            pt_name for pt_name, details in PT.items() 
-            if os.getenv(details['env'])
+            account for pt_name, details in PT.items()
+            for account, _ in site_accounts(pt_name, details)
         ],
     }
     
@@ -243,33 +381,60 @@ def init_json_file():
             }
         })
     
-    if not os.path.exists('PT_attendance.json'):
-        with open('PT_attendance.json', 'w') as f:
-            json.dump(default_data, f, indent=4)
+    if state.load_json('PT_attendance.json') is None:
+        state.save_json('PT_attendance.json', default_data, indent=4)
     
     return default_data
 
 
+def site_accounts(pt_name, pt_config):
+    """拆分站点环境变量中的账号，返回 [(账号标识, cookie)]
+
+    账号标识不随位置变化：有 label 时为 站点名#名称，否则第一个未加 label 的账号为站点名，
+    其余为 站点名#Cookie指纹前8位；标识重复的账号只保留第一个。
+    """
+    accounts = {}
+    for cookie in ACCOUNT_SEPARATOR.split(os.getenv(pt_config['env'], '')):
+        cookie = cookie.strip()
+        if not cookie:
+            continue
+        match = ACCOUNT_LABEL.match(cookie)
+        if match:
+            cookie = cookie[match.end():]
+            account = f'{pt_name}#{match.group(1).strip()}'
+        elif pt_name in accounts:
+            account = f'{pt_name}#{fingerprint(cookie)[:8]}'
+        else:
+            account = pt_name
+        if not cookie:
+            continue
+        if account in accounts:
+            print(f'账号{account}重复，忽略')
+            continue
+        accounts[account] = cookie
+    return list(accounts.items())
+
+
 def generate_report(detail):
     """生成报告内容"""
     today = time.strftime('%Y-%m-%d')
     completed_sites = [pt for pt in detail['enables'] 
-                      if detail[pt]['last_attendance'] == today]
+                      if detail.get(pt, {}).get('last_attendance') == today]
     
     report = [
         "<h1>PT详情：</h1>",
         f"支持站点数量：{detail['total']}个<br>",
-        f"启用站点数量：{len(detail['enables'])}个<br>",
-        f"已完成签到站点：{len(completed_sites)}个<br><hr>"
+        f"启用账号数量：{len(detail['enables'])}个<br>",
+        f"已完成签到账号：{len(completed_sites)}个<br><hr>"
     ]
     return ''.join(report)
 
 
-def update_total_and_enables(detail, pt_name, cookie):
-    """更新总数和启用站点列表"""
-    # 更新启用站点列表
-    if pt_name not in detail['enables'] and cookie:
-        detail['enables'].append(pt_name)
+def update_total_and_enables(detail, account, cookie):
+    """更新总数和启用账号列表"""
+    # 更新启用账号列表
+    if account not in detail['enables'] and cookie:
+        detail['enables'].append(account)
 
     # 更新总数
     detail['total'] = len(PT)
@@ -314,6 +479,48 @@ def update_station_info(detail, pt_name, attendance_detail, basic_info):
     })
 
 
+def site_of(account):
+    """账号标识对应的站点名"""
+    return account.split('#', 1)[0]
+
+
+def new_notices(detail, site, notices):
+    """筛选站点未推送过的公告并记录指纹，同一站点的多个账号只推送一次"""
+    seen = detail.setdefault('notice_seen', {}).get(site, [])
+    seen_set = set(seen)
+    fresh, page = [], []
+    for date, content in notices:
+        key = fingerprint(f'{date}|{content}')
+        page.append(key)
+        if key not in seen_set:
+            fresh.append([date, content])
+            seen_set.add(key)
+
+    # 页面上的公告在前，其余按原顺序保留，总数有上限
+    page_set = set(page)
+    detail['notice_seen'][site] = (
+        page + [key for key in seen if key not in page_set]
+    )[:NOTICE_HISTORY]
+    return fresh
+
+
+def station_metrics(attendance_detail, basic_info):
+    """转换为入库的数值指标，上传/下载量以字节计"""
+    rank = str(attendance_detail.get('today_rank', '')).split('/')[0]
+    return {
+        'times': parse_number(attendance_detail.get('times')),
+        'continue': parse_number(attendance_detail.get('continue')),
+        'reward': parse_number(attendance_detail.get('reward')),
+        'retroactive_cards': parse_number(attendance_detail.get('retroactive_cards')),
+        'rank': parse_number(rank),
+        'share_ratio': parse_number(basic_info.get('share_ratio')),
+        'upload_bytes': parse_size(basic_info.get('upload_count')),
+        'download_bytes': parse_size(basic_info.get('download_count')),
+        'magic': parse_number(basic_info.get('ml_count')),
+        'mails': parse_number(basic_info.get('mails')),
+    }
+
+
 def generate_station_report(pt_name, attendance_detail, basic_info):
     """生成站点报告"""
     report = []
@@ -332,63 +539,165 @@ def generate_station_report(pt_name, attendance_detail, basic_info):
         f'• 新消息：{basic_info["mails"]}条<br>',
     ])
     
-    # 添加公告
+    # 添加新公告
     notices_html = ''.join([
         f'<li>{date} - {content}</li>' 
         for date, content in basic_info["notices"]
     ])
-    report.append(f'• 公告：<ul>{notices_html}</ul><hr>')
+    if notices_html:
+        report.append(f'• 新公告：<ul>{notices_html}</ul>')
+    report.append('<hr>')
     
     return report
 
 
+def check_in_site(pt_name, pt_config, cookie):
+    """执行单个账号签到，签到页与首页并发获取
+
+    pt_name 为账号标识，同一站点同时签到的账号数受 HOST_WORKERS 限制。
+    """
+    with host_semaphore(pt_config['index_url'], HOST_WORKERS):
+        return _check_in_account(pt_name, pt_config, cookie)
+
+
+def _check_in_account(pt_name, pt_config, cookie):
+    print(f'{pt_name}: 开始签到...')
+    client = PTClient(
+        cookie=cookie,
+        attendance_url=pt_config['attendance_url'],
+        index_url=pt_config['index_url'],
+        attendance_schema=pt_config.get('attendance_schema', NEXUSPHP_ATTENDANCE),
+        index_schema=pt_config.get('index_schema', NEXUSPHP_INDEX),
+        cache=INDEX_CACHE,
+        name=pt_name,
+        login_pattern=pt_config.get('login_pattern', NEXUSPHP_LOGIN)
+    )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        attendance_future = executor.submit(
+            METRICS.call, pt_name, 'attendance', client.attendance
+        )
+        index_future = executor.submit(
+            METRICS.call, pt_name, 'index', client.index_info
+        )
+        attendance_detail = attendance_future.result()
+        basic_info = index_future.result()
+
+    if client.stream:
+        saved = client.traffic['bytes_saved']
+        print(f'{pt_name}: 读取{client.traffic["bytes_read"]}字节，'
+              f'节省{"未知" if saved is None else saved}字节')
+    return attendance_detail, basic_info, client.traffic
+
+
+def due_key(account, cookie):
+    """待办索引中的账号标识，Cookie 变化后视为新任务"""
+    return f'{account}@{fingerprint(cookie)}'
+
+
+def is_quarantined(detail, account, cookie):
+    """账号当前的 Cookie 是否已判定失效"""
+    entry = detail.get('quarantine', {}).get(account)
+    return bool(entry) and entry['cookie'] == fingerprint(cookie)
+
+
+def quarantine(detail, account, cookie):
+    """隔离 Cookie 失效的账号，只记录 Cookie 指纹"""
+    detail.setdefault('quarantine', {})[account] = {
+        'cookie': fingerprint(cookie),
+        'since': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def completed_sites(detail, accounts):
+    """今日无需处理的账号（已签到或 Cookie 已隔离），返回待办索引标识"""
+    today = time.strftime('%Y-%m-%d')
+    return [due_key(account, cookie) for account, cookie in accounts
+            if detail.get(account, {}).get('last_attendance') == today
+            or is_quarantined(detail, account, cookie)]
+
+
 def run():
     """主函数"""
+    # 先查待办索引，全部完成时不读取状态、不联网
+    enabled = [account for pt_name, pt_config in PT.items()
+               for account in site_accounts(pt_name, pt_config)]
+    due = DueIndex(DUE_FILE)
+    if due.is_idle([due_key(account, cookie) for account, cookie in enabled]):
+        print('所有站点今日已签到，跳过...')
+        SPOOL.flush()
+        return
+
+    METRICS.reset()
+
     # 初始化JSON文件
-    if not os.path.exists('PT_attendance.json'):
-        init_json_file()
-    
-    with open('PT_attendance.json', 'r+') as f:
-        detail = json.load(f)
-        detail.setdefault('enables', [])
-        f.seek(0)
-        json.dump(detail, f, indent=4)
-        f.truncate()
+    detail = state.load_json('PT_attendance.json')
+    if detail is None:
+        detail = init_json_file()
+    detail.setdefault('enables', [])
 
     result = []
-    need_push = False
     today = time.strftime('%Y-%m-%d')
 
-    # 处理每个站点
+    # 筛选需要签到的账号
+    pending = []
     for pt_name in PT.keys():
         pt_config = PT.get(pt_name, {})
         if not pt_config:
             continue
 
-        cookie = os.getenv(pt_config['env'])
-        if not cookie:
+        accounts = site_accounts(pt_name, pt_config)
+        if not accounts:
             print(f'{pt_name}: 未找到环境变量 {pt_config["env"]}')
             continue
-            
-        try:
-            if detail[pt_name]['last_attendance'] == today:
-                print(f'{pt_name}: 今日已签到，跳过...')
+
+        for rank, (account, cookie) in enumerate(accounts):
+            if is_quarantined(detail, account, cookie):
+                print(f'{account}: Cookie 已失效，更新环境变量后恢复签到')
                 continue
-        except KeyError:
-            print(f'站点{pt_name}为新增站点，执行...')
-
-        need_push = True
-        print(f'{pt_name}: 开始签到...')
-        
-        client = PTClient(
-            cookie=cookie,
-            attendance_url=pt_config['attendance_url'],
-            index_url=pt_config['index_url']
-        )
+            # Cookie 已更新，解除隔离
+            detail.get('quarantine', {}).pop(account, None)
+
+            try:
+                if detail[account]['last_attendance'] == today:
+                    print(f'{account}: 今日已签到，跳过...')
+                    continue
+            except KeyError:
+                print(f'账号{account}为新增账号，执行...')
+
+            pending.append((account, pt_config, cookie, rank))
+
+    if not pending:
+        due.save(completed_sites(detail, enabled))
+        SPOOL.flush()
+        return
+
+    # 并发签到，各站点的账号轮流提交，避免线程都阻塞在同一站点的并发限制上；
+    # 结果按 PT 中的站点及账号顺序合并
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            pt_name: executor.submit(check_in_site, pt_name, pt_config, cookie)
+            for pt_name, pt_config, cookie, _ in sorted(pending, key=lambda item: item[3])
+        }
 
-        # 获取签到信息和站点基本信息
-        attendance_detail = client.attendance()
-        basic_info = client.index_info()
+    for pt_name, pt_config, cookie, _ in pending:
+        future = futures[pt_name]
+        try:
+            attendance_detail, basic_info, traffic = future.result()
+        except LoginRequiredError as e:
+            print(e)
+            quarantine(detail, pt_name, cookie)
+            result.append(
+                f'<h2 style="color:red">{pt_name} Cookie 已失效</h2>'
+                f'请更新环境变量 {pt_config["env"]}，更新前不再尝试签到<hr>'
+            )
+            continue
+        except CircuitOpenError as e:
+            print(f'{pt_name}: {e}')
+            attendance_detail, basic_info, traffic = {'status': False}, {'status': False}, None
+        except Exception as e:
+            print(f'{pt_name}: 签到失败: {e}')
+            attendance_detail, basic_info, traffic = {'status': False}, {'status': False}, None
 
         if attendance_detail['status'] and basic_info['status']:
             # 更新总数和启用站点列表
@@ -397,8 +706,21 @@ def run():
             # 初始化站点数据
             init_station_data(detail, pt_name)
             
+            # 只保留未推送过的公告（basic_info 可能来自首页缓存，不原地修改）
+            basic_info = {**basic_info, 'notices': new_notices(
+                detail, site_of(pt_name), basic_info.get('notices', [])
+            )}
+
             # 更新站点信息
             update_station_info(detail, pt_name, attendance_detail, basic_info)
+            if traffic and traffic['bytes_read']:
+                detail[pt_name]['traffic'] = traffic
+            try:
+                HISTORY.record('PT', pt_name, station_metrics(
+                    attendance_detail, basic_info
+                ))
+            except Exception as e:
+                print(f'{pt_name}: 历史数据写入失败: {e}')
             
             # 生成站点报告
             result.extend(generate_station_report(
@@ -411,17 +733,16 @@ def run():
     result.insert(0, generate_report(detail))
     
     # 更新JSON文件
-    with open('PT_attendance.json', 'w', encoding='utf8') as f:
-        json.dump(detail, f, indent=4)
+    state.save_json('PT_attendance.json', detail, indent=4)
+    BREAKER.save()
+    INDEX_CACHE.save()
+    METRICS.export()
+    due.save(completed_sites(detail, enabled))
 
-    # 推送通知
-    if need_push:
-        final_report = ''.join(result)
-        try:
-            QLAPI.notify("PT签到报告", final_report)
-        except ImportError:
-            print("未找到青龙通知模块，跳过通知推送")
+    # 报告写入通知队列后推送
+    SPOOL.put("PT签到报告", ''.join(result), source='pt')
+    SPOOL.flush()
 
 
 if __name__ == "__main__":
-    run()
+    run()
\ No newline at end of file
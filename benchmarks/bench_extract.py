@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+页面字段提取微基准：旧版逐字段 findall/search 与声明式提取对比
+
+用法：
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --index index.html --attendance attendance.html --fn fn.html
+
+未指定页面时使用生成的大页面（页头 + 公告 + 大量种子行）。
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FN_attendance import FNClient  # noqa: E402
+from PT_attendance import NEXUSPHP_ATTENDANCE, NEXUSPHP_INDEX, PTClient  # noqa: E402
+
+
+# ---- 旧版实现 ----
+
+def _safe_re_search(pattern, text, group=0, cleanup=False):
+    match = re.findall(pattern, text)
+    if match:
+        result = match[0] if isinstance(match, list) else match
+        return result.replace(' ', '') if cleanup else result
+    return 'N/A'
+
+
+def _safe_re_rank(text):
+    match = re.search(r'今日签到排名：<b>(\d+)</b> / <b>(\d+)</b>', text)
+    return '/'.join(match.groups()) if match else 'N/A/N/A'
+
+
+def legacy_attendance(text):
+    if '欢迎回来' not in text:
+        return {'status': False}
+    return {
+        'status': True,
+        'times': _safe_re_search(r'这是您的第.*?(\d+)', text),
+        'continue': _safe_re_search(r'已连续签到.*?(\d+)', text),
+        'reward': _safe_re_search(r'本次签到获得.*?(\d+)', text),
+        'retroactive_cards': _safe_re_search(r'目前拥有补签卡.*?(\d+)', text),
+        'today_rank': _safe_re_rank(text),
+    }
+
+
+def legacy_index(text):
+    if '欢迎回来' not in text:
+        return {'status': False}
+    return {
+        'status': True,
+        'share_ratio': _safe_re_search(r'分享率.*?(\d+\.\d+)', text),
+        'upload_count': _safe_re_search(r'上传量:</font>(.*?)<', text, cleanup=True),
+        'download_count': _safe_re_search(r'下载量:</font>(.*?)<', text, cleanup=True),
+        'ml_count': _safe_re_search(r'使用</a>]:(.*?)<', text, cleanup=True),
+        'mails': _safe_re_search(r'(\d+) 新', text),
+        'notices': re.findall(r'(\d{4}\.\d{2}\.\d{2}) - <b>(.*?)</b>', text),
+    }
+
+
+def legacy_fn(html):
+    patterns = {
+        'recently_attendance': r'最近打卡：(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})',
+        'month_attendance_times': r'本月打卡：(\d+)',
+        'continue_attendance_times': r'连续打卡：(\d+)',
+        'total_attendance_times': r'累计打卡：(\d+)',
+        'total_reward': r'累计奖励：(\d+)',
+        'recently_reward': r'最近奖励：(\d+)',
+        'level': r'当前打卡等级：(.+?)</li>'
+    }
+    details = {}
+    for key, pattern in patterns.items():
+        if match := re.search(pattern, html):
+            details[key] = match.group(1)
+    return details
+
+
+# ---- 生成页面 ----
+
+def _torrent_rows(count):
+    return ''.join(
+        f'<tr><td class="rowfollow"><a href="details.php?id={i}">'
+        f'Some.Movie.{i}.2160p.WEB-DL.H265</a></td><td>{i % 97}.{i % 10} GB</td>'
+        f'<td>{i % 300}</td><td>{i % 50}</td></tr>\n'
+        for i in range(count)
+    )
+
+
+def make_index_page(rows=3000):
+    header = (
+        '<html><head><title>NexusPHP</title></head><body>\n'
+        + '<div class="menu"><a href="torrents.php">种子</a></div>\n' * 200
+        + '<span class="medium">欢迎回来, <b>user</b> [<a href="logout.php">退出</a>]'
+        '<font class="color_ratio">分享率:</font> 3.512 '
+        '<font class="color_uploaded">上传量:</font> 12.34 TB '
+        '<font class="color_downloaded">下载量:</font> 3.51 TB '
+        '[<a href="mybonus.php">使用</a>]: 123,456.7 '
+        '<a href="messages.php">3 新</a></span>\n'
+    )
+    news = ''.join(
+        f'<a href="javascript: klappe_news(\'a{i}\')">2025.0{i % 9 + 1}.1{i % 9} - <b>站点公告 {i}</b></a>\n'
+        for i in range(10)
+    )
+    return header + news + _torrent_rows(rows) + '</body></html>'
+
+
+def make_attendance_page(rows=3000):
+    return (
+        '<html><body><span>欢迎回来, user</span>\n'
+        + '<div class="menu">nav</div>\n' * 200
+        + '<p>这是您的第 <b>321</b> 次签到，已连续签到 <b>45</b> 天，'
+        '本次签到获得 <b>120</b> 个魔力值。</p>'
+        '<p>目前拥有补签卡 <b>2</b> 张。</p>'
+        '<p>今日签到排名：<b>17</b> / <b>1203</b></p>\n'
+        + _torrent_rows(rows) + '</body></html>'
+    )
+
+
+def make_fn_page(rows=3000):
+    return (
+        '<html><body>' + '<div class="nav">nav</div>\n' * 200
+        + '<ul><li>最近打卡：2025-07-30 08:00:01</li><li>本月打卡：30</li>'
+        '<li>连续打卡：30</li><li>累计打卡：365</li><li>累计奖励：1200</li>'
+        '<li>最近奖励：5</li><li>当前打卡等级：Lv.5 打卡达人</li></ul>\n'
+        + _torrent_rows(rows) + '</body></html>'
+    )
+
+
+def _load(path, factory):
+    if not path:
+        return factory()
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def bench(name, page, legacy, engine, number):
+    legacy_time = timeit.timeit(lambda: legacy(page), number=number) / number
+    engine_time = timeit.timeit(lambda: engine(page), number=number) / number
+    print(f'{name:<12}{len(page) / 1024:>10.0f}KB'
+          f'{legacy_time * 1e6:>14.1f}us{engine_time * 1e6:>14.1f}us'
+          f'{legacy_time / engine_time:>10.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--index', help='抓取的首页 HTML')
+    parser.add_argument('--attendance', help='抓取的签到页 HTML')
+    parser.add_argument('--fn', help='抓取的飞牛签到页 HTML')
+    parser.add_argument('-n', '--number', type=int, default=200, help='每项执行次数')
+    args = parser.parse_args()
+
+    pages = {
+        'attendance': _load(args.attendance, make_attendance_page),
+        'index': _load(args.index, make_index_page),
+        'fn': _load(args.fn, make_fn_page),
+    }
+
+    print(f'{"page":<12}{"size":>12}{"legacy":>16}{"engine":>16}{"speedup":>11}')
+    bench('attendance', pages['attendance'], legacy_attendance,
+          lambda text: PTClient._parse(NEXUSPHP_ATTENDANCE, text), args.number)
+    bench('index', pages['index'], legacy_index,
+          lambda text: PTClient._parse(NEXUSPHP_INDEX, text), args.number)
+    bench('fn', pages['fn'], legacy_fn,
+          FNClient._parse_attendance_details, args.number)
+
+
+if __name__ == '__main__':
+    main()
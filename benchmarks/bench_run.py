@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""
+端到端基准：在本地模拟站点上运行 PT_attendance.run()、FN_attendance.main()、lottery_check.run()
+
+用法：
+    python benchmarks/bench_run.py --sites 200 --latency 0.05
+    python benchmarks/bench_run.py --target pt --sites 500 --hosts 50 --error-rate 0.05
+
+每个目标在独立子进程中、独立的临时目录里运行（状态文件互不影响），
+统计墙钟时间、请求数、传输字节数和峰值内存。
+--hosts 大于 1 时站点分散到 127.0.0.2 起的多个回环地址（仅 Linux）。
+PT 的按主机限流默认关闭（PT_HOST_RPS=0），否则主要测到的是限流等待；
+用 --host-rps 2 可按脚本默认配置测量。
+"""
+
+import argparse
+import builtins
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+TARGETS = ('pt', 'fn', 'lottery')
+
+
+class _Notifier:
+    """替代青龙通知，只记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def notify(self, title, content):
+        self.calls += 1
+
+
+def _site_host(index, hosts, port):
+    if hosts <= 1:
+        return f'127.0.0.1:{port}'
+    return f'127.0.0.{2 + index % hosts}:{port}'
+
+
+def _prepare_pt(args):
+    import PT_attendance
+    PT_attendance.PT = {}
+    for i in range(args.sites):
+        host = _site_host(i, args.hosts, args.port)
+        env = f'BENCH_SITE{i}_cookie'
+        os.environ[env] = f'c_secure_uid=site{i}; c_secure_pass=x'
+        PT_attendance.PT[f'SITE{i}'] = {
+            'env': env,
+            'attendance_url': f'http://{host}/pt/site{i}/attendance.php',
+            'index_url': f'http://{host}/pt/site{i}/index.php',
+        }
+    return PT_attendance.run
+
+
+def _prepare_fn(args):
+    import FN_attendance
+    FN_attendance.BASIC_URL = f'http://127.0.0.1:{args.port}/fn/plugin.php?id=zqlj_sign'
+    os.environ['PV_COOKIE'] = 'auth=bench'
+    return FN_attendance.main
+
+
+def _prepare_lottery(args):
+    import lottery_check
+    for api in lottery_check.LOTTERY_APIS.values():
+        api['url'] = f'http://127.0.0.1:{args.port}/cwl/findDrawNotice'
+    os.environ['LOTTERY_SSQ'] = '01,05,12,18,22,30,07'
+    os.environ['LOTTERY_3D'] = '5,2,8'
+    os.environ['LOTTERY_KL8'] = ','.join(str(n) for n in range(1, 40, 4))
+    return lottery_check.run
+
+
+def child(args):
+    """在子进程中运行单个目标，输出 JSON 结果"""
+    os.chdir(tempfile.mkdtemp(prefix=f'bench_{args.child}_'))
+    notifier = _Notifier()
+    builtins.QLAPI = notifier
+
+    entry = globals()[f'_prepare_{args.child}'](args)
+    tracemalloc.start()
+    start = time.perf_counter()
+    entry()
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(json.dumps({
+        'wall': wall,
+        'peak_python_kb': peak / 1024,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'notifications': notifier.calls,
+    }))
+
+
+def run_target(target, args, server):
+    """启动子进程运行目标并统计服务端请求"""
+    before = server.stats()
+    command = [
+        sys.executable, __file__, '--child', target, '--port', str(server.port),
+        '--sites', str(args.sites), '--hosts', str(args.hosts),
+    ]
+    output = subprocess.run(
+        command, capture_output=True, text=True,
+        env={**os.environ, 'PT_HOST_RPS': str(args.host_rps)}
+    )
+    after = server.stats()
+    if output.returncode != 0:
+        print(output.stderr, file=sys.stderr)
+        raise SystemExit(f'{target} 运行失败')
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result['requests'] = after['requests'] - before['requests']
+    result['bytes'] = after['bytes'] - before['bytes']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟站点端到端基准')
+    parser.add_argument('--target', choices=TARGETS + ('all',), default='all')
+    parser.add_argument('--sites', type=int, default=9, help='PT 模拟站点数')
+    parser.add_argument('--hosts', type=int, default=1, help='站点分散的回环地址数')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 503 的比例')
+    parser.add_argument('--page-rows', type=int, default=3000, help='页面填充的种子行数')
+    parser.add_argument('--host-rps', type=float, default=0,
+                        help='PT 每主机每秒请求数上限（PT_HOST_RPS），0 表示不限速')
+    parser.add_argument('--child', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    from fake_server import FakeServer
+    server = FakeServer(
+        host='0.0.0.0' if args.hosts > 1 else '127.0.0.1',
+        latency=args.latency, error_rate=args.error_rate, page_rows=args.page_rows,
+    ).start()
+    try:
+        targets = TARGETS if args.target == 'all' else (args.target,)
+        print(f'{"target":<10}{"wall(s)":>10}{"requests":>10}{"bytes":>14}'
+              f'{"peak py(KB)":>14}{"max rss(KB)":>14}')
+        for target in targets:
+            result = run_target(target, args, server)
+            print(f'{target:<10}{result["wall"]:>10.3f}{result["requests"]:>10}'
+                  f'{result["bytes"]:>14}{result["peak_python_kb"]:>14.0f}'
+                  f'{result["max_rss_kb"]:>14}')
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
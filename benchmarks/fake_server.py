@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟站点：NexusPHP 签到页/首页、飞牛 zqlj_sign 插件页、福彩 findDrawNotice 接口
+
+路由：
+    /pt/<site>/attendance.php        NexusPHP 签到页
+    /pt/<site>/index.php             NexusPHP 首页（带公告和种子列表填充）
+    /fn/plugin.php?id=zqlj_sign      飞牛签到插件页，带 &sign= 时完成签到
+    /cwl/findDrawNotice?name=ssq     开奖公告 JSON（ssq/3d/kl8）
+
+可配置延迟、错误率（返回 503）和页面大小，并统计请求数与发送字节数
+（按写出的响应体计）。
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench_extract import make_attendance_page, make_fn_page, make_index_page
+
+FN_SIGN = 'a1b2c3d4'
+
+
+def _draw_date():
+    weekdays = '一二三四五六日'
+    return time.strftime('%Y-%m-%d') + f'({weekdays[time.localtime().tm_wday]})'
+
+
+def draw_notice(name):
+    """生成开奖公告"""
+    if name == 'ssq':
+        result = {
+            'name': '双色球', 'code': '2025088', 'date': _draw_date(),
+            'red': '01,05,12,18,22,30', 'blue': '07',
+            'prizegrades': [
+                {'type': 1, 'typenum': '5', 'typemoney': '8000000'},
+                {'type': 2, 'typenum': '120', 'typemoney': '200000'},
+                {'type': 3, 'typenum': '1500', 'typemoney': '3000'},
+                {'type': 4, 'typenum': '60000', 'typemoney': '200'},
+                {'type': 5, 'typenum': '1200000', 'typemoney': '10'},
+                {'type': 6, 'typenum': '9000000', 'typemoney': '5'},
+            ],
+        }
+    elif name == '3d':
+        result = {
+            'name': '3D', 'code': '2025201', 'date': _draw_date(),
+            'red': '5,2,8', 'blue': '',
+            'prizegrades': [
+                {'type': 1, 'typenum': '8000', 'typemoney': '1040'},
+                {'type': 2, 'typenum': '0', 'typemoney': '346'},
+                {'type': 3, 'typenum': '20000', 'typemoney': '173'},
+            ],
+        }
+    else:
+        result = {
+            'name': '快乐8', 'code': '2025201', 'date': _draw_date(),
+            'red': ','.join(f'{n:02d}' for n in range(1, 80, 4)), 'blue': '',
+            'prizegrades': [
+                {'type': f'x10z{m}', 'typenum': '10', 'typemoney': money}
+                for m, money in ((10, '5000000'), (9, '8000'), (8, '720'),
+                                 (7, '80'), (6, '5'), (5, '3'), (0, '2'))
+            ],
+        }
+    return {'state': 0, 'message': '查询成功', 'result': [result]}
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端流式读取提前断开属于正常情况
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeServer:
+    """在后台线程运行的模拟服务器"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                 page_rows=3000):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.bytes_sent = 0
+        self.signed = set()
+        self._lock = threading.Lock()
+        self._pages = {
+            'attendance': make_attendance_page(page_rows).encode('utf-8'),
+            'index': make_index_page(page_rows).encode('utf-8'),
+        }
+        self._fn_page = make_fn_page(page_rows)
+        self.httpd = _HTTPServer((host, port), self._handler())
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'bytes': self.bytes_sent}
+
+    def _count(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+    def _fn_body(self, cookie, query):
+        if 'sign' in query:
+            self.signed.add(cookie)
+        if cookie in self.signed:
+            return self._fn_page.replace('<ul>', '<ul><li>今日已打卡</li>', 1)
+        return self._fn_page.replace(
+            '<ul>', f'<a href="plugin.php?id=zqlj_sign&sign={FN_SIGN}">打卡</a><ul>', 1
+        )
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.error_rate and random.random() < server.error_rate:
+                    return self._send(503, b'', 'text/plain')
+
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                if url.path.startswith('/pt/'):
+                    page = 'attendance' if (url.path.endswith('attendance.php')
+                                            or 'action' in query) else 'index'
+                    return self._send(200, server._pages[page])
+                if url.path.startswith('/fn/'):
+                    body = server._fn_body(self.headers.get('Cookie', ''), query)
+                    return self._send(200, body.encode('utf-8'))
+                if url.path.startswith('/cwl/'):
+                    body = json.dumps(draw_notice(query.get('name', ['ssq'])[0]))
+                    return self._send(200, body.encode('utf-8'), 'application/json')
+                return self._send(404, b'', 'text/plain')
+
+            def _send(self, status, body, content_type='text/html; charset=utf-8'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端流式读取提前断开
+                    pass
+                server._count(len(body))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
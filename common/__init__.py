@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+"""
+各签到/检查脚本共用的工具模块
+"""
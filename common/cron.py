@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""
+五段式 cron 表达式（分 时 日 月 周），按本地时间计算下次触发时间
+
+支持 *、*/n、a-b、a-b/n、a,b 组合；日与周同时限定时满足其一即可（与 cron 一致）。
+"""
+
+import datetime
+import re
+
+# 青龙脚本头部的定时规则，如 `0 */1 * * * PT_attendance.py`
+SCRIPT_CRON = re.compile(r'^\s*((?:\S+\s+){4}\S+)\s+\S+\.py\s*$', re.M)
+
+_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        value_range, slash, step = part.partition('/')
+        step = int(step) if slash else 1
+        if value_range == '*':
+            start, end = low, high
+        elif '-' in value_range:
+            start, end = map(int, value_range.split('-', 1))
+        else:
+            start = int(value_range)
+            end = high if slash else start
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f'cron 字段超出范围: {part}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpr:
+    """cron 表达式"""
+
+    def __init__(self, expr):
+        self.expr = expr
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f'cron 表达式应为5段: {expr}')
+        for (name, low, high), part in zip(_FIELDS, parts):
+            setattr(self, name, _parse_field(part, low, high))
+        if 7 in self.weekday:
+            self.weekday = (self.weekday - {7}) | {0}
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    @classmethod
+    def from_script(cls, source):
+        """从脚本文档中的青龙定时规则解析"""
+        match = SCRIPT_CRON.search(source or '')
+        if not match:
+            raise ValueError('未找到定时规则')
+        return cls(match.group(1))
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.day
+        # cron 中周日为0，datetime 中周一为0
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekday
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """moment（datetime）之后的下一次触发时间"""
+        moment = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.month:
+                year = moment.year + moment.month // 12
+                moment = moment.replace(year=year, month=moment.month % 12 + 1,
+                                        day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hour:
+                moment = (moment + datetime.timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minute:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'cron 表达式无触发时间: {self.expr}')
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""
+开奖历史归档（定长二进制文件 + mmap）
+
+每个彩种一个 lottery_<彩种>.draws 文件，按期号升序存放32字节定长记录：
+    期号 uint32 | 日期 uint32（YYYYMMDD）| 号码低64位 | 号码高64位 |
+    蓝球 uint8 | 保留 | 奖级数 uint16 | 奖级偏移 uint32
+号码编码与 common.lottery_match 一致：双色球红球、快乐8为位图，3D 为打包的三位数。
+奖级明细追加在 lottery_<彩种>.prizes 中，每项6字节：奖级代码 uint16 | 单注奖金（分）uint32，
+未公布奖金的奖级不写入。
+
+期号与日期都随记录递增，按期号、日期查询均在 mmap 上二分查找，不解析 JSON。
+比最后一期新的开奖直接追加；补缺的开奖插入对应位置（重写记录文件）。
+期号为 年份 + 三位序号，同年内连续，跨年从001开始，据此检查缺期。
+
+查询示例：
+    python -m common.draw_archive ssq 2025001
+    python -m common.draw_archive kl8 --date 2025-10-01
+"""
+
+import mmap
+import os
+import re
+import struct
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from common.lottery_match import encode, pack_digits
+
+RECORD = struct.Struct('<IIQQBxHI')
+PRIZE = struct.Struct('<HI')
+_ISSUE = struct.Struct('<I')
+_DATE_OFFSET = 4
+
+_WEEKDAYS = '一二三四五六日'
+_KL8_TYPE = re.compile(r'x(\d+)z(\d+)')
+
+# 归档中的一期开奖：prizes 为 [(奖级, 单注奖金)]
+Draw = namedtuple('Draw', 'issue date red blue prizes')
+
+
+def _day_number(day):
+    """日期转为 YYYYMMDD 整数，接受 date 或 '2025-10-01(三)' 形式的字符串"""
+    if isinstance(day, (date, datetime)):
+        return day.year * 10000 + day.month * 100 + day.day
+    return int(day[:10].replace('-', ''))
+
+
+def _fen(value):
+    """奖金字符串转为分，未公布（'---'、空）时返回 None"""
+    try:
+        return int(Decimal(str(value).replace(',', '')).scaleb(2).to_integral_value())
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _yuan(fen):
+    return fen // 100 if fen % 100 == 0 else fen / 100
+
+
+def follows(previous, issue):
+    """issue 是否紧接 previous 一期"""
+    return issue == previous + 1 or \
+        (issue // 1000 == previous // 1000 + 1 and issue % 1000 == 1)
+
+
+class DrawArchive:
+    """单个彩种的开奖归档"""
+
+    def __init__(self, lottery_type, directory='.'):
+        self.lottery_type = lottery_type
+        self.path = os.path.join(directory, f'lottery_{lottery_type}.draws')
+        self.prize_path = os.path.join(directory, f'lottery_{lottery_type}.prizes')
+        self._records = self._prizes = None
+        self._open()
+
+    def _open(self):
+        self.close()
+        self._records = self._map(self.path)
+        self._prizes = self._map(self.prize_path)
+
+    @staticmethod
+    def _map(path):
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def close(self):
+        for mapped in (self._records, self._prizes):
+            if mapped is not None:
+                mapped.close()
+        self._records = self._prizes = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def __len__(self):
+        # 忽略写入中断留下的不完整记录
+        return len(self._records) // RECORD.size if self._records is not None else 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._decode(RECORD.unpack_from(self._records, index * RECORD.size))
+
+    def _field(self, index, offset):
+        return _ISSUE.unpack_from(self._records, index * RECORD.size + offset)[0]
+
+    def _lower_bound(self, offset, value):
+        """第一个字段值 >= value 的记录序号"""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._field(middle, offset) < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _contains(self, issue):
+        index = self._lower_bound(0, issue)
+        return index < len(self) and self._field(index, 0) == issue
+
+    def first_gap(self):
+        """第一处缺期之前的期号，没有缺期时为 None"""
+        for index in range(len(self) - 1):
+            issue = self._field(index, 0)
+            if not follows(issue, self._field(index + 1, 0)):
+                return issue
+        return None
+
+    def last_issue(self):
+        """最后一期的期号，空归档为0"""
+        return self._field(len(self) - 1, 0) if len(self) else 0
+
+    def latest(self):
+        return self[-1] if len(self) else None
+
+    def by_issue(self, issue):
+        """按期号查询"""
+        issue = int(issue)
+        if self._contains(issue):
+            return self[self._lower_bound(0, issue)]
+        return None
+
+    def by_date(self, day):
+        """按开奖日期查询当天第一期"""
+        day = _day_number(day)
+        index = self._lower_bound(_DATE_OFFSET, day)
+        if index < len(self) and self._field(index, _DATE_OFFSET) == day:
+            return self[index]
+        return None
+
+    def between(self, start, end):
+        """日期区间内（含首尾）的开奖"""
+        index = self._lower_bound(_DATE_OFFSET, _day_number(start))
+        end = _day_number(end)
+        while index < len(self) and self._field(index, _DATE_OFFSET) <= end:
+            yield self[index]
+            index += 1
+
+    def append(self, results):
+        """写入开奖接口返回的结果，已归档的期号跳过，返回新增期数
+
+        比最后一期新的直接追加到文件末尾；早于最后一期的缺期插入对应位置。
+        """
+        new = {}
+        for result in results:
+            issue = int(result['code'])
+            if issue not in new and not self._contains(issue):
+                new[issue] = result
+        if not new:
+            return 0
+        last, count = self.last_issue(), len(self)
+
+        prize_fd = os.open(self.prize_path, os.O_RDWR | os.O_CREAT, 0o644)
+        record_fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # 截掉写入中断留下的半条记录
+            os.ftruncate(record_fd, count * RECORD.size)
+            offset = os.lseek(prize_fd, 0, os.SEEK_END) // PRIZE.size
+            os.ftruncate(prize_fd, offset * PRIZE.size)
+            os.lseek(prize_fd, 0, os.SEEK_END)
+
+            prizes, records = bytearray(), []
+            for issue in sorted(new):
+                result = new[issue]
+                grades = []
+                for grade in result.get('prizegrades') or []:
+                    code, fen = self._prize_code(grade['type']), _fen(grade.get('typemoney'))
+                    if code is not None and fen is not None:
+                        grades.append(PRIZE.pack(code, fen))
+                low, high, blue = self._encode_numbers(result)
+                records.append(RECORD.pack(issue, _day_number(result['date']),
+                                           low, high, blue, len(grades), offset))
+                prizes += b''.join(grades)
+                offset += len(grades)
+            # 先写奖级再写记录，记录不会指向未写入的奖级
+            os.write(prize_fd, prizes)
+            if min(new) > last:
+                os.lseek(record_fd, 0, os.SEEK_END)
+                os.write(record_fd, b''.join(records))
+            else:
+                self._rewrite(records)
+        finally:
+            os.close(prize_fd)
+            os.close(record_fd)
+        self._open()
+        return len(new)
+
+    def _rewrite(self, records):
+        """与已有记录按期号合并后整体替换记录文件"""
+        existing = [
+            self._records[index * RECORD.size:(index + 1) * RECORD.size]
+            for index in range(len(self))
+        ]
+        merged = sorted(existing + records, key=lambda record: _ISSUE.unpack_from(record)[0])
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(merged))
+        os.replace(tmp_path, self.path)
+
+    def _encode_numbers(self, result):
+        numbers = result['red'].split(',')
+        if self.lottery_type == '3d':
+            return pack_digits(numbers), 0, 0
+        mask = encode(numbers, 1, 80)
+        blue = int(result['blue']) if result.get('blue') else 0
+        return mask & (2 ** 64 - 1), mask >> 64, blue
+
+    def _prize_code(self, prize_type):
+        if self.lottery_type == 'kl8':
+            match = _KL8_TYPE.fullmatch(str(prize_type))
+            return int(match.group(1)) * 16 + int(match.group(2)) if match else None
+        return int(prize_type) if str(prize_type).isdigit() else None
+
+    def _prize_type(self, code):
+        if self.lottery_type == 'kl8':
+            return f'x{code // 16}z{code % 16}'
+        return code
+
+    def _decode(self, record):
+        issue, day, low, high, blue, count, offset = record
+        if self.lottery_type == '3d':
+            red = [low // 100, low // 10 % 10, low % 10]
+        else:
+            mask = low | high << 64
+            red = [bit + 1 for bit in range(mask.bit_length()) if mask >> bit & 1]
+        prizes = [
+            PRIZE.unpack_from(self._prizes, (offset + i) * PRIZE.size)
+            for i in range(count)
+        ]
+        day = date(day // 10000, day // 100 % 100, day % 100)
+        return Draw(issue, day, red, blue,
+                    [(self._prize_type(code), _yuan(fen)) for code, fen in prizes])
+
+    def to_info(self, draw):
+        """转为与开奖接口相同结构的字典"""
+        if self.lottery_type == '3d':
+            red, blue = ','.join(map(str, draw.red)), ''
+        else:
+            red = ','.join(f'{n:02}' for n in draw.red)
+            blue = f'{draw.blue:02}' if draw.blue else ''
+        return {
+            'code': str(draw.issue),
+            'date': f'{draw.date.isoformat()}({_WEEKDAYS[draw.date.weekday()]})',
+            'red': red,
+            'blue': blue,
+            'prizegrades': [
+                {'type': prize_type, 'typemoney': str(money)}
+                for prize_type, money in draw.prizes
+            ],
+        }
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='开奖历史查询')
+    parser.add_argument('lottery_type', choices=('ssq', '3d', 'kl8'))
+    parser.add_argument('issue', nargs='?', help='期号，省略时为最新一期')
+    parser.add_argument('--date', help='开奖日期，如 2025-10-01')
+    parser.add_argument('--dir', default='.')
+    args = parser.parse_args()
+
+    archive = DrawArchive(args.lottery_type, args.dir)
+    if args.date:
+        draw = archive.by_date(args.date)
+    elif args.issue:
+        draw = archive.by_issue(args.issue)
+    else:
+        draw = archive.latest()
+    if draw is None:
+        parser.exit(1, '未找到开奖记录\n')
+    print(json.dumps(archive.to_info(draw), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
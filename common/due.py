@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+轻量待办索引
+
+只记录当天已完成的站点/账号，脚本启动时先读这个小文件判断
+是否有需要处理的任务；全部完成时直接退出，不读取完整状态、
+不导入 requests、不写任何文件。
+"""
+
+import time
+
+from common import state
+
+
+class DueIndex:
+    """当天已完成任务的索引"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        try:
+            return state.load_json(self.path, {})
+        except (IOError, ValueError):
+            return {}
+
+    def is_idle(self, keys):
+        """keys 中的任务今天是否都已完成"""
+        data = self._load()
+        if data.get('date') != time.strftime('%Y-%m-%d'):
+            return False
+        return set(keys) <= set(data.get('done', []))
+
+    def save(self, done):
+        """保存今天已完成的任务，内容未变化时不写文件"""
+        data = {'date': time.strftime('%Y-%m-%d'), 'done': sorted(done)}
+        if self._load() == data:
+            return
+        try:
+            state.save_json(self.path, data)
+        except IOError:
+            pass
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+按主机复用的 HTTP 连接池
+
+同一进程内对同一主机的所有请求共享一个 requests.Session，
+避免每次请求（包括重试）都重新进行 TCP/TLS 握手。
+会话头中带账号 Cookie 的客户端使用 account_session()，按账号登记、跨运行复用。
+"""
+
+import codecs
+import functools
+import threading
+import time
+from urllib.parse import urlsplit
+
+from common.metrics import on_connect
+
+DEFAULT_POOL_SIZE = 10
+
+_sessions = {}
+_account_sessions = {}  # (主机, 账号标识) -> Session
+_semaphores = {}
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter_class():
+    """构造统计建连耗时的适配器类
+
+    requests/urllib3 在首次创建 Session 时才导入，
+    无需联网的运行不承担导入开销。
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def timed(connection_cls):
+        class TimedConnection(connection_cls):
+            def connect(self):
+                start = time.perf_counter()
+                super().connect()
+                on_connect(self.host, time.perf_counter() - start)
+        return TimedConnection
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = timed(HTTPConnection)
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = timed(HTTPSConnection)
+
+    class TimedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': TimedHTTPConnectionPool,
+                'https': TimedHTTPSConnectionPool,
+            }
+
+    return TimedAdapter
+
+
+def host_of(url):
+    """提取 URL 中的主机（含端口）"""
+    return urlsplit(url).netloc.lower()
+
+
+def get_session(url, pool_size=DEFAULT_POOL_SIZE):
+    """获取 URL 所属主机的共享 Session"""
+    host = host_of(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = new_session(pool_size)
+            _sessions[host] = session
+        return session
+
+
+def account_session(url, key, pool_size=DEFAULT_POOL_SIZE):
+    """获取账号专用的 Session，key 通常为 Cookie 指纹
+
+    调用方可在会话头中设置该账号的 Cookie，不影响其他账号；同一账号在常驻进程中
+    多次运行时复用，由 close_sessions() 统一关闭。
+    """
+    registry_key = (host_of(url), key)
+    with _lock:
+        session = _account_sessions.get(registry_key)
+        if session is None:
+            session = new_session(pool_size)
+            _account_sessions[registry_key] = session
+        return session
+
+
+def host_semaphore(url, limit):
+    """获取 URL 所属主机的并发信号量，同一主机的多个账号共享"""
+    host = host_of(url)
+    with _lock:
+        semaphore = _semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(max(1, limit))
+            _semaphores[host] = semaphore
+        return semaphore
+
+
+def response_charset(response, default='utf-8'):
+    """从 Content-Type 中取字符集，缺省时使用 default，不做编码探测"""
+    content_type = response.headers.get('Content-Type', '')
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            charset = value.strip().strip('"\'')
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                break
+    return default
+
+
+def close_sessions():
+    """关闭所有共享 Session 和账号 Session"""
+    with _lock:
+        for registry in (_sessions, _account_sessions):
+            for session in registry.values():
+                session.close()
+            registry.clear()
+
+
+def new_session(pool_size=DEFAULT_POOL_SIZE):
+    """创建带连接池的 Session（不登记到共享表）"""
+    from http.cookiejar import DefaultCookiePolicy
+
+    import requests
+
+    session = requests.Session()
+    adapter = _adapter_class()(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'accept-encoding': 'gzip, deflate',
+        'connection': 'keep-alive',
+    })
+    # 会话由同一主机的多个账号共享，不保存服务端下发的 Cookie，
+    # 账号 Cookie 始终通过请求头发送
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+
+"""
+彩票批量兑奖引擎
+
+号码以整数位图保存，按批统计命中个数：
+    双色球  红球 1-33 -> 位图 bit0-32，蓝球 1-16 单独保存
+    快乐8   1-64 -> 低位 uint64，65-80 -> 高位 uint64
+    福彩3D  三位数字打包为 0-999 的整数；各玩法记为（玩法, 值），
+            按开奖号码查 1000 项预计算表得到各玩法的中奖值
+
+安装了 NumPy 时按批向量化计算（位运算 + popcount），
+否则逐注计算，结果相同。
+"""
+
+from collections import namedtuple
+from math import comb
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+# 每批处理的注数，控制临时数组的内存占用
+BATCH_SIZE = 1 << 20
+
+# 兑奖结果：histogram 为 {奖级: 注数}，winners 为 [(注序号, 奖级)]
+MatchResult = namedtuple('MatchResult', 'histogram winners')
+
+NO_PRIZE = '未中奖'
+
+# 双色球奖级，下标为 红球命中数 * 2 + 蓝球是否命中
+SSQ_TIERS = (
+    NO_PRIZE, '六等奖',   # 红0
+    NO_PRIZE, '六等奖',   # 红1
+    NO_PRIZE, '六等奖',   # 红2
+    NO_PRIZE, '五等奖',   # 红3
+    '五等奖', '四等奖',   # 红4
+    '四等奖', '三等奖',   # 红5
+    '二等奖', '一等奖',   # 红6
+)
+
+# 快乐8各玩法（选几）有奖的命中个数
+KL8_WINNING_HITS = {
+    10: {10, 9, 8, 7, 6, 5, 0},
+    9: {9, 8, 7, 6, 5, 4, 0},
+    8: {8, 7, 6, 5, 4, 0},
+    7: {7, 6, 5, 4, 0},
+    6: {6, 5, 4, 3},
+    5: {5, 4, 3},
+    4: {4, 3, 2},
+    3: {3, 2},
+    2: {2},
+    1: {1},
+}
+_KL8_CODES = 11 * 16  # 玩法 * 16 + 命中数
+
+
+# Python 3.10 起 int 自带 bit_count
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+def encode(numbers, low=1, high=None):
+    """号码列表转为位图，low/high 为号码范围"""
+    mask = 0
+    for number in numbers:
+        number = int(number)
+        if number < low or (high is not None and number > high):
+            raise ValueError(f'号码超出范围: {number}')
+        mask |= 1 << (number - low)
+    return mask
+
+
+def kl8_tier(picks, hits):
+    """快乐8奖级名称"""
+    return f'选{picks}中{hits}'
+
+
+def _bitwise_count(array):
+    """uint64 数组逐元素 popcount"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(array)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[array.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+def _histogram(names, count):
+    """奖级代码计数 -> {奖级: 注数}"""
+    histogram = {}
+    for code, total in enumerate(count):
+        if total:
+            name = names(code)
+            histogram[name] = histogram.get(name, 0) + int(total)
+    return histogram
+
+
+class _Tickets:
+    """票据集合的公共部分：追加号码、按批兑奖"""
+
+    def __init__(self):
+        self._columns = [[] for _ in self._fields]
+        self._arrays = None
+
+    def __len__(self):
+        if self._arrays is not None:
+            return len(self._arrays[0])
+        return len(self._columns[0])
+
+    def _append(self, *values):
+        if self._arrays is not None:
+            # 已转为数组后再追加，先转回列表
+            self._columns = [list(map(int, array)) for array in self._arrays]
+            self._arrays = None
+        for column, value in zip(self._columns, values):
+            column.append(value)
+
+    def arrays(self):
+        """NumPy 数组形式的票据列"""
+        if self._arrays is None:
+            self._arrays = tuple(
+                np.asarray(column, dtype=dtype)
+                for column, dtype in zip(self._columns, self._fields)
+            )
+            self._columns = None
+        return self._arrays
+
+    @classmethod
+    def from_arrays(cls, *arrays):
+        """直接由编码好的数组创建，用于大批量票据"""
+        tickets = cls()
+        tickets._arrays = tuple(
+            np.asarray(array, dtype=dtype) for array, dtype in zip(arrays, cls._fields)
+        )
+        tickets._columns = None
+        return tickets
+
+    def _match(self, codes_of, code_of, code_names, winning, code_count,
+               batch_size=BATCH_SIZE):
+        """按批兑奖
+
+        codes_of(*数组切片) 返回奖级代码数组，code_of(*单注) 返回单注奖级代码，
+        code_names(code) 为奖级名称，winning[code] 表示该奖级是否中奖。
+        """
+        if np is None or (self._arrays is None and len(self) < 64):
+            return self._match_python(code_of, code_names, winning)
+
+        arrays = self.arrays()
+        winning = np.asarray(winning, dtype=bool)
+        count = np.zeros(code_count, dtype=np.int64)
+        winners = []
+        for start in range(0, len(arrays[0]), batch_size):
+            codes = codes_of(*(array[start:start + batch_size] for array in arrays))
+            count += np.bincount(codes, minlength=code_count)
+            for index in np.flatnonzero(winning[codes]):
+                winners.append((start + int(index), code_names(int(codes[index]))))
+        return MatchResult(_histogram(code_names, count), winners)
+
+    def _match_python(self, code_of, code_names, winning):
+        columns = self._columns if self._arrays is None else \
+            [list(map(int, array)) for array in self._arrays]
+        histogram, winners = {}, []
+        for index, values in enumerate(zip(*columns)):
+            code = code_of(*values)
+            name = code_names(code)
+            histogram[name] = histogram.get(name, 0) + 1
+            if winning[code]:
+                winners.append((index, name))
+        return MatchResult(histogram, winners)
+
+
+class SSQTickets(_Tickets):
+    """双色球票据：红球位图 + 蓝球号码"""
+
+    _fields = ('uint64', 'uint8')
+
+    def add(self, reds, blue):
+        """添加一注：6个红球 + 1个蓝球"""
+        if len(set(reds)) != 6:
+            raise ValueError('双色球应为6个不同的红球')
+        if not 1 <= int(blue) <= 16:
+            raise ValueError(f'蓝球超出范围: {blue}')
+        self._append(encode(reds, 1, 33), int(blue))
+
+    def match(self, reds, blue, batch_size=BATCH_SIZE):
+        """按开奖号码兑奖"""
+        win_red, win_blue = encode(reds), int(blue)
+        winning = [tier != NO_PRIZE for tier in SSQ_TIERS]
+
+        def code_of(red, blue_):
+            return _popcount(red & win_red) * 2 + (blue_ == win_blue)
+
+        def codes_of(red, blue_):
+            hits = _bitwise_count(red & np.uint64(win_red)).astype(np.intp)
+            return hits * 2 + (blue_ == win_blue)
+
+        return self._match(codes_of, code_of, SSQ_TIERS.__getitem__, winning,
+                           len(SSQ_TIERS), batch_size)
+
+
+class KL8Tickets(_Tickets):
+    """快乐8票据：1-64 与 65-80 两段位图，选几由号码个数决定"""
+
+    _fields = ('uint64', 'uint64', 'uint8')
+
+    def add(self, numbers):
+        """添加一注：1-10个不重复的号码"""
+        picks = len(numbers)
+        if picks not in KL8_WINNING_HITS:
+            raise ValueError('快乐8应选1-10个号码')
+        mask = encode(numbers, 1, 80)
+        # '01' 与 '1' 视为同一号码，按位图判断重复
+        if _popcount(mask) != picks:
+            raise ValueError('快乐8号码重复')
+        self._append(mask & (2 ** 64 - 1), mask >> 64, picks)
+
+    def match(self, numbers, batch_size=BATCH_SIZE):
+        """按开奖号码兑奖，奖级为 选N中M"""
+        win = encode(numbers)
+        win_low, win_high = win & (2 ** 64 - 1), win >> 64
+
+        def code_of(low, high, picks):
+            return picks * 16 + _popcount(low & win_low) + _popcount(high & win_high)
+
+        winning = [False] * _KL8_CODES
+        for picks, hits in KL8_WINNING_HITS.items():
+            for hit in hits:
+                winning[picks * 16 + hit] = True
+
+        def codes_of(low, high, picks):
+            hits = _bitwise_count(low & np.uint64(win_low)).astype(np.intp) + \
+                _bitwise_count(high & np.uint64(win_high))
+            return picks.astype(np.intp) * 16 + hits
+
+        return self._match(codes_of, code_of,
+                           lambda code: kl8_tier(code // 16, code % 16),
+                           winning, _KL8_CODES, batch_size)
+
+
+def _d3_tables():
+    """3D 全部 1000 个号码的形态（0组六、1组三、2豹子）、和值、排序后号码、数字位图"""
+    shapes, sums, sorted_, digits = [], [], [], []
+    for packed in range(1000):
+        d = (packed // 100, packed // 10 % 10, packed % 10)
+        shapes.append(3 - len(set(d)))
+        sums.append(sum(d))
+        a, b, c = sorted(d)
+        sorted_.append(a * 100 + b * 10 + c)
+        digits.append(sum(1 << x for x in set(d)))
+    return tuple(shapes), tuple(sums), tuple(sorted_), tuple(digits)
+
+
+D3_SHAPE, D3_SUM, D3_SORTED, D3_DIGITS = _d3_tables()
+D3_GROUP6, D3_GROUP3 = 0, 1
+# 玩法代码即下标
+D3_PLAYS = ('直选', '组三', '组六', '和值', '组三包号', '组六包号')
+
+
+def d3_sum_tier(total):
+    """3D 和值奖级名称"""
+    return f'和值{total}'
+
+
+class D3Tickets(_Tickets):
+    """福彩3D票据：玩法代码 + 值
+
+    直选为打包的三位数，组三/组六为排序后的三位数，和值为 0-27，
+    包号为所选数字的位图（组三包号2-10个数字，组六包号3-10个数字）。
+    """
+
+    _fields = ('uint8', 'uint16')
+
+    def add(self, digits, play='直选'):
+        """添加一注，和值玩法 digits 为 [和值]"""
+        self._append(*encode_d3(digits, play))
+
+    @classmethod
+    def from_packed(cls, plays, packed):
+        """由玩法代码数组和打包号码数组批量创建直选/组三/组六票据，查表完成分类"""
+        plays = np.asarray(plays, dtype=np.uint8)
+        packed = np.asarray(packed, dtype=np.uint16)
+        shape = np.asarray(D3_SHAPE, dtype=np.uint8)[packed]
+        if np.any(plays > 2) or np.any((plays == 1) & (shape != D3_GROUP3)) or \
+                np.any((plays == 2) & (shape != D3_GROUP6)):
+            raise ValueError('玩法与号码形态不符')
+        values = np.where(plays == 0, packed, np.asarray(D3_SORTED, dtype=np.uint16)[packed])
+        return cls.from_arrays(plays, values)
+
+    def match(self, digits, batch_size=BATCH_SIZE):
+        """按开奖号码兑奖，奖级为 直选、组三、组六、和值N"""
+        win = pack_digits(digits)
+        shape, total, win_digits = D3_SHAPE[win], D3_SUM[win], D3_DIGITS[win]
+        # 各玩法的中奖值，-1 表示本期该玩法不可能中奖
+        targets = (
+            win,
+            D3_SORTED[win] if shape == D3_GROUP3 else -1,
+            D3_SORTED[win] if shape == D3_GROUP6 else -1,
+            total,
+            -1,
+            -1,
+        )
+        tiers = ('直选', '组三', '组六', d3_sum_tier(total), '组三', '组六')
+        names = [NO_PRIZE if code % 2 == 0 else tiers[code // 2]
+                 for code in range(len(D3_PLAYS) * 2)]
+        winning = [code % 2 == 1 for code in range(len(names))]
+        # 本期可能中奖的包号玩法：所选数字包含开奖号码的全部数字即中奖
+        box_play = {D3_GROUP3: 4, D3_GROUP6: 5}.get(shape)
+
+        def code_of(play, value):
+            if play == box_play:
+                return play * 2 + (value & win_digits == win_digits)
+            return play * 2 + (value == targets[play])
+
+        def codes_of(plays, values):
+            plays = plays.astype(np.intp)
+            hits = values.astype(np.int32) == np.asarray(targets, dtype=np.int32)[plays]
+            if box_play is not None:
+                hits |= (plays == box_play) & (values & win_digits == win_digits)
+            return plays * 2 + hits
+
+        return self._match(codes_of, code_of, names.__getitem__, winning,
+                           len(names), batch_size)
+
+
+def encode_d3(digits, play='直选'):
+    """3D 一注编码为（玩法代码, 值）"""
+    if play not in D3_PLAYS:
+        raise ValueError(f'未知的3D玩法: {play}')
+    code = D3_PLAYS.index(play)
+    if play == '直选':
+        return code, pack_digits(digits)
+    if play in ('组三', '组六'):
+        packed = pack_digits(digits)
+        if D3_SHAPE[packed] != (D3_GROUP3 if play == '组三' else D3_GROUP6):
+            raise ValueError(f'{play}号码形态不符: {digits}')
+        return code, D3_SORTED[packed]
+    if play == '和值':
+        if len(digits) != 1 or not 0 <= int(digits[0]) <= 27:
+            raise ValueError('和值应为一个 0-27 的数')
+        return code, int(digits[0])
+    numbers = {int(d) for d in digits}
+    low = 2 if play == '组三包号' else 3
+    if not low <= len(numbers) <= 10 or not all(0 <= d <= 9 for d in numbers) \
+            or len(numbers) != len(digits):
+        raise ValueError(f'{play}应为{low}-10个不同的 0-9 数字')
+    return code, sum(1 << d for d in numbers)
+
+
+def parse_ssq_compound(text):
+    """解析双色球复式/胆拖：`红球+蓝球` 或 `胆码#拖码+蓝球`，号码用逗号分隔"""
+    reds, plus, blues = text.partition('+')
+    dan, sharp, tuo = reds.rpartition('#')
+    if not plus:
+        raise ValueError('复式/胆拖应以 + 分隔红球与蓝球')
+    dan = [int(n) for n in dan.split(',') if n.strip()]
+    tuo = [int(n) for n in tuo.split(',') if n.strip()]
+    blues = [int(n) for n in blues.split(',') if n.strip()]
+    if len(set(dan + tuo)) != len(dan) + len(tuo) or len(set(blues)) != len(blues):
+        raise ValueError('号码重复')
+    if not all(1 <= n <= 33 for n in dan + tuo) or not all(1 <= n <= 16 for n in blues):
+        raise ValueError('号码超出范围')
+    if len(dan) > 5 or (sharp and not dan) or len(dan) + len(tuo) < 6 or not blues:
+        raise ValueError('胆码应为1-5个，红球合计至少6个，蓝球至少1个')
+    return dan, tuo, blues
+
+
+def ssq_compound(dan, tuo, blues, reds, blue):
+    """双色球复式/胆拖兑奖，按组合数计算各奖级注数，不展开为单式
+
+    胆码全部入选，从拖码中选 6-胆码数 个；红球命中 dan_hits + k 的注数为
+    C(拖码命中数, k) * C(拖码未中数, 6-胆码数-k)，再乘以命中/未中蓝球的个数。
+    返回 {奖级: 注数}。
+    """
+    reds = {int(n) for n in reds}
+    need = 6 - len(dan)
+    dan_hits = len(reds.intersection(dan))
+    tuo_hits = len(reds.intersection(tuo))
+    tuo_miss = len(tuo) - tuo_hits
+    blue_hits = int(int(blue) in blues)
+    blue_counts = ((0, len(blues) - blue_hits), (1, blue_hits))
+
+    histogram = {}
+    for k in range(min(tuo_hits, need) + 1):
+        red_bets = comb(tuo_hits, k) * comb(tuo_miss, need - k)
+        if not red_bets:
+            continue
+        for blue_hit, blue_bets in blue_counts:
+            if blue_bets:
+                tier = SSQ_TIERS[(dan_hits + k) * 2 + blue_hit]
+                histogram[tier] = histogram.get(tier, 0) + red_bets * blue_bets
+    return histogram
+
+
+def pack_digits(digits):
+    """3D 号码打包为 0-999 的整数"""
+    digits = [int(d) for d in digits]
+    if len(digits) != 3 or not all(0 <= d <= 9 for d in digits):
+        raise ValueError('3D 应为3个 0-9 的数字')
+    return digits[0] * 100 + digits[1] * 10 + digits[2]
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+运行指标：按站点/阶段统计耗时与结果
+
+每次运行结束后导出：
+    <job>_metrics.prom   Prometheus textfile（可供 node_exporter textfile collector 采集）
+    <job>_metrics.json   本次运行汇总 + 跨运行累计的延迟直方图与计数
+
+导出目录由 METRICS_DIR 指定，默认当前目录。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from common import state
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_context = threading.local()
+
+
+class RunMetrics:
+    """单个任务的运行指标"""
+
+    def __init__(self, job, directory=None):
+        self.job = job
+        self.directory = directory or os.getenv('METRICS_DIR', '.')
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """开始新一轮运行"""
+        with self._lock:
+            self.started = time.time()
+            self.latencies = {}  # (site, phase) -> [秒]
+            self.counters = {}   # (site, name, outcome) -> 次数
+
+    @contextmanager
+    def site(self, site):
+        """标记当前线程正在处理的站点，建连和重试统计归入该站点"""
+        previous = getattr(_context, 'current', None)
+        _context.current = (self, site)
+        try:
+            yield
+        finally:
+            _context.current = previous
+
+    def observe(self, site, phase, seconds):
+        """记录一次阶段耗时"""
+        with self._lock:
+            self.latencies.setdefault((site, phase), []).append(seconds)
+
+    def inc(self, site, name, outcome='ok', value=1):
+        """计数"""
+        with self._lock:
+            key = (site, name, outcome)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, site, phase):
+        """记录代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(site, phase, time.perf_counter() - start)
+
+    def call(self, site, name, func, *args, **kwargs):
+        """执行一次调用，记录总耗时和结果
+
+        返回 dict 且 status 为 False 时结果记为 invalid，异常记为异常类名。
+        """
+        with self.site(site), self.timer(site, name):
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.inc(site, name, e.__class__.__name__)
+                raise
+        outcome = 'invalid' if isinstance(result, dict) and \
+            result.get('status') is False else 'ok'
+        self.inc(site, name, outcome)
+        return result
+
+    def record_retry(self, host, exc, wait):
+        """RetryPolicy 的 on_retry 回调"""
+        current = getattr(_context, 'current', None)
+        site = current[1] if current and current[0] is self else host
+        self.inc(site, 'retries', exc.__class__.__name__)
+        self.observe(site, 'retry_wait', wait)
+
+    def record_rate_wait(self, host, wait):
+        """HostRateLimiter 的 on_wait 回调"""
+        current = getattr(_context, 'current', None)
+        site = current[1] if current and current[0] is self else host
+        self.inc(site, 'rate_limited')
+        self.observe(site, 'rate_wait', wait)
+
+    def export(self):
+        """写出 Prometheus textfile 和 JSON 汇总，累计直方图跨运行保留"""
+        json_path = os.path.join(self.directory, f'{self.job}_metrics.json')
+        prom_path = os.path.join(self.directory, f'{self.job}_metrics.prom')
+        try:
+            cumulative = self._load_cumulative(json_path)
+            with self._lock:
+                summary = self._summary()
+                for (site, phase), values in self.latencies.items():
+                    hist = cumulative['histograms'].setdefault(
+                        f'{site}|{phase}',
+                        {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+                    )
+                    for value in values:
+                        for i, bound in enumerate(BUCKETS):
+                            if value <= bound:
+                                hist['buckets'][i] += 1
+                        hist['sum'] += value
+                        hist['count'] += 1
+                for (site, name, outcome), value in self.counters.items():
+                    key = f'{site}|{name}|{outcome}'
+                    cumulative['counters'][key] = cumulative['counters'].get(key, 0) + value
+
+            data = {'run': summary, **cumulative}
+            state.save_json(json_path, data, ensure_ascii=False, indent=2)
+            state.save_file(prom_path, self._prometheus(summary, cumulative))
+        except (IOError, ValueError) as e:
+            logger.warning(f'指标导出失败: {e}')
+
+    def _summary(self):
+        latencies = {}
+        for (site, phase), values in sorted(self.latencies.items()):
+            latencies.setdefault(site, {})[phase] = {
+                'count': len(values),
+                'total': round(sum(values), 6),
+                'max': round(max(values), 6),
+            }
+        counters = {}
+        for (site, name, outcome), value in sorted(self.counters.items()):
+            counters.setdefault(site, {}).setdefault(name, {})[outcome] = value
+        return {
+            'job': self.job,
+            'started': self.started,
+            'duration': round(time.time() - self.started, 6),
+            'latencies': latencies,
+            'counters': counters,
+        }
+
+    @staticmethod
+    def _load_cumulative(path):
+        try:
+            data = state.load_json(path, {})
+            return {'histograms': data.get('histograms', {}),
+                    'counters': data.get('counters', {})}
+        except (IOError, json.JSONDecodeError):
+            return {'histograms': {}, 'counters': {}}
+
+    def _prometheus(self, summary, cumulative):
+        job = _escape(self.job)
+        lines = [
+            '# HELP ql_phase_seconds Per-site phase latency.',
+            '# TYPE ql_phase_seconds histogram',
+        ]
+        for key, hist in sorted(cumulative['histograms'].items()):
+            site, phase = key.split('|', 1)
+            labels = f'job="{job}",site="{_escape(site)}",phase="{_escape(phase)}"'
+            for bound, count in zip(BUCKETS, hist['buckets']):
+                lines.append(f'ql_phase_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'ql_phase_seconds_bucket{{{labels},le="+Inf"}} {hist["count"]}')
+            lines.append(f'ql_phase_seconds_sum{{{labels}}} {hist["sum"]}')
+            lines.append(f'ql_phase_seconds_count{{{labels}}} {hist["count"]}')
+
+        lines += [
+            '# HELP ql_calls_total Calls by site, call and outcome.',
+            '# TYPE ql_calls_total counter',
+        ]
+        for key, value in sorted(cumulative['counters'].items()):
+            site, name, outcome = key.split('|', 2)
+            lines.append(
+                f'ql_calls_total{{job="{job}",site="{_escape(site)}",'
+                f'call="{_escape(name)}",outcome="{_escape(outcome)}"}} {value}'
+            )
+
+        lines += [
+            '# HELP ql_last_run_duration_seconds Duration of the last run.',
+            '# TYPE ql_last_run_duration_seconds gauge',
+            f'ql_last_run_duration_seconds{{job="{job}"}} {summary["duration"]}',
+            '# HELP ql_last_run_timestamp_seconds Start time of the last run.',
+            '# TYPE ql_last_run_timestamp_seconds gauge',
+            f'ql_last_run_timestamp_seconds{{job="{job}"}} {summary["started"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def on_connect(host, seconds):
+    """建连耗时（DNS、TCP、TLS 握手）归入当前线程正在处理的站点"""
+    current = getattr(_context, 'current', None)
+    if current:
+        metrics, site = current
+        metrics.observe(site, 'connect', seconds)
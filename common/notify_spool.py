@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""
+本地通知队列
+
+各脚本把报告追加到 notify_spool.jsonl，再统一推送：
+    - NOTIFY_WINDOW（秒，默认0）内的报告合并为一条汇总推送，0 表示每次运行结束即推送
+    - 推送失败时报告保留在队列中，按指数退避在之后的运行中重试
+    - 同一时刻只有一个进程推送，其余进程只追加
+    - 无法推送时（如不在青龙中运行、推送失败）队列只保留最新的 max_entries 条
+"""
+
+import builtins
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows 下不加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'notify_spool.jsonl'
+DIGEST_TITLE = '青龙脚本通知汇总'
+
+# 找不到 QLAPI 的提示每个进程只输出一次
+_warned_no_sender = False
+
+
+class _FileLock:
+    """基于 fcntl 的文件锁，blocking=False 时获取失败 acquired 为 False"""
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.acquired = False
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is None:
+            self.acquired = True
+            return self
+        flags = fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(self._file, flags)
+            self.acquired = True
+        except OSError:
+            self.acquired = False
+        return self
+
+    def __exit__(self, *exc):
+        if self.acquired and fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+class NotifySpool:
+    """通知队列，window 为合并窗口秒数"""
+
+    def __init__(self, path=DEFAULT_PATH, window=None, base_delay=60,
+                 max_delay=3600, max_entries=200):
+        self.path = path
+        self.window = int(os.getenv('NOTIFY_WINDOW', '0')) if window is None else window
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_entries = max_entries
+        self.state_path = f'{path}.state'
+
+    def put(self, title, content, source=None):
+        """追加一条报告，只写本地文件"""
+        line = json.dumps({
+            'ts': time.time(), 'title': title, 'content': content, 'source': source,
+        }, ensure_ascii=False)
+        try:
+            with _FileLock(f'{self.path}.lock'):
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except IOError as e:
+            logger.error(f'通知写入队列失败: {e}')
+            return False
+        return True
+
+    def pending(self):
+        """队列中是否有待推送的报告，不创建任何文件"""
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def flush(self, sender=None, force=False):
+        """推送队列中的报告，成功返回 True
+
+        未到合并窗口或处于退避期时不推送；sender 缺省使用青龙的 QLAPI.notify。
+        """
+        if not self.pending():
+            return True
+        with _FileLock(f'{self.path}.flush', blocking=False) as flush_lock:
+            if not flush_lock.acquired:
+                return False
+            entries, line_count = self._read()
+            if not entries:
+                return True
+
+            now = time.time()
+            state = self._load_state()
+            if not force:
+                if now < state.get('next_attempt', 0):
+                    self._trim()
+                    return False
+                if now - entries[0]['ts'] < self.window:
+                    return False
+
+            if sender is None:
+                qlapi = getattr(builtins, 'QLAPI', None) or \
+                    getattr(sys.modules.get('__main__'), 'QLAPI', None)
+                if qlapi is None:
+                    global _warned_no_sender
+                    if not _warned_no_sender:
+                        _warned_no_sender = True
+                        logger.warning(
+                            '未找到青龙通知模块（QLAPI），当前环境下通知不会推送；'
+                            f'报告保留在 {self.path}，只保留最新{self.max_entries}条'
+                        )
+                    self._trim()
+                    return False
+                sender = qlapi.notify
+
+            title, content = self._digest(entries)
+            try:
+                sender(title, content)
+            except Exception as e:
+                attempts = state.get('attempts', 0) + 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                self._save_state({'attempts': attempts, 'next_attempt': now + delay})
+                logger.warning(f'通知推送失败（第{attempts}次），{delay}秒后重试: {e}')
+                self._trim()
+                return False
+
+            self._remove(line_count)
+            if state:
+                self._save_state({})
+            return True
+
+    @staticmethod
+    def _digest(entries):
+        """单条报告原样推送，多条合并为汇总"""
+        if len(entries) == 1:
+            return entries[0]['title'], entries[0]['content']
+        content = ''.join(
+            f'<h1>{entry["title"]}</h1>{entry["content"]}<hr>' for entry in entries
+        )
+        return f'{DIGEST_TITLE}（{len(entries)}条）', content
+
+    def _read(self):
+        """读取队列，返回 (报告列表, 已读取的行数)
+
+        超过 max_entries 时只保留最新的报告，较早的随本次推送一并移除。
+        """
+        if not os.path.exists(self.path):
+            return [], 0
+        entries = []
+        with _FileLock(f'{self.path}.lock'):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries[-self.max_entries:], len(lines)
+
+    def _trim(self):
+        """队列超过 max_entries 条时删去最早的，调用方需持有推送锁"""
+        with _FileLock(f'{self.path}.lock'):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            if len(lines) <= self.max_entries:
+                return
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines[-self.max_entries:])
+            os.replace(tmp_path, self.path)
+
+    def _remove(self, line_count):
+        """移除已读取的行，推送期间新追加的保留"""
+        with _FileLock(f'{self.path}.lock'):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                rest = f.readlines()[line_count:]
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(rest)
+            os.replace(tmp_path, self.path)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        try:
+            if state:
+                with open(self.state_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+            elif os.path.exists(self.state_path):
+                os.remove(self.state_path)
+        except IOError as e:
+            logger.warning(f'通知状态保存失败: {e}')
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+页面解析结果的磁盘缓存
+
+按 key 保存解析后的字段以及 ETag/Last-Modified，
+在 TTL 内直接复用，过期后通过条件请求确认页面是否变化。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from common.state import persist
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(value):
+    """计算字符串指纹，用于区分账号而不保存明文"""
+    import hashlib
+
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+
+
+class PageCache:
+    """页面缓存，ttl 为秒，0 表示每次都请求（仍会发送条件请求）"""
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries = None  # 首次使用时读取，提前退出的运行不读缓存文件
+
+    @property
+    def _data(self):
+        """缓存内容，首次访问时读取文件，调用方需持有锁"""
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self):
+        """读取缓存文件"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning(f'缓存读取失败: {e}')
+            return {}
+
+    def get(self, key, owner):
+        """获取缓存条目，owner 与写入时不一致视为未命中"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry.get('owner') == fingerprint(owner):
+                return entry
+            return None
+
+    def is_fresh(self, entry):
+        """条目是否仍在 TTL 内"""
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    @staticmethod
+    def validators(entry):
+        """生成条件请求头"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, key, owner, data, headers):
+        """写入解析结果及响应中的校验头"""
+        with self._lock:
+            self._data[key] = {
+                'owner': fingerprint(owner),
+                'fetched_at': time.time(),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'data': data,
+            }
+            self._dirty = True
+
+    def touch(self, key):
+        """页面未变化（304），刷新缓存时间"""
+        with self._lock:
+            if key in self._data:
+                self._data[key]['fetched_at'] = time.time()
+                self._dirty = True
+
+    def save(self):
+        """保存缓存文件，常驻进程中延迟到 state.flush()"""
+        persist(self._write)
+
+    def _write(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False, indent=2)
+                self._dirty = False
+            except IOError as e:
+                logger.warning(f'缓存保存失败: {e}')
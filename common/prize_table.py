@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+单期奖金表
+
+由开奖公告的 prizegrades 预先建立 {奖级: 单注奖金} 字典，按奖级或
+快乐8的（选几, 中几）查询均为 O(1)。接口缺少 prizegrades 或某奖级
+奖金未公布时，使用官方固定奖金；浮动奖级（双色球一、二等奖，
+快乐8选十中十、选九中九）没有固定值，缺失时记为0。
+"""
+
+import re
+
+from common.lottery_match import NO_PRIZE, d3_sum_tier, kl8_tier
+
+SSQ_LEVELS = ('一等奖', '二等奖', '三等奖', '四等奖', '五等奖', '六等奖')
+D3_LEVELS = ('直选', '组三', '组六')
+
+# 官方固定奖金（元）
+SSQ_FIXED = {'三等奖': 3000, '四等奖': 200, '五等奖': 10, '六等奖': 5}
+D3_FIXED = {'直选': 1040, '组三': 346, '组六': 173}
+# 3D 和值：和值与 27-和值 奖金相同
+D3_SUM_FIXED = {
+    0: 1040, 1: 345, 2: 172, 3: 104, 4: 69, 5: 49, 6: 37,
+    7: 29, 8: 23, 9: 19, 10: 16, 11: 15, 12: 15, 13: 14,
+}
+# 快乐8：选几 -> {中几: 奖金}
+KL8_FIXED = {
+    10: {9: 8000, 8: 720, 7: 80, 6: 5, 5: 3, 0: 2},
+    9: {8: 2000, 7: 200, 6: 20, 5: 5, 4: 3, 0: 2},
+    8: {8: 50000, 7: 800, 6: 88, 5: 10, 4: 3, 0: 2},
+    7: {7: 10000, 6: 288, 5: 28, 4: 4, 0: 2},
+    6: {6: 3000, 5: 30, 4: 10, 3: 3},
+    5: {5: 1000, 4: 21, 3: 3},
+    4: {4: 100, 3: 5, 2: 3},
+    3: {3: 53, 2: 3},
+    2: {2: 19},
+    1: {1: 4.6},
+}
+
+_KL8_TYPE = re.compile(r'x(\d+)z(\d+)')
+
+
+def _money(value):
+    """奖金字符串转为数字，未公布（'---'、空）时返回 None"""
+    try:
+        money = float(str(value).replace(',', ''))
+    except ValueError:
+        return None
+    return int(money) if money.is_integer() else money
+
+
+class PrizeTable:
+    """单期各奖级的单注奖金"""
+
+    def __init__(self, amounts):
+        self._amounts = amounts
+
+    @classmethod
+    def for_draw(cls, lottery_type, info=None):
+        """由开奖公告建立奖金表，info 为 None 时只含固定奖金"""
+        if lottery_type == 'kl8':
+            amounts = {
+                kl8_tier(picks, hits): money
+                for picks, table in KL8_FIXED.items()
+                for hits, money in table.items()
+            }
+        elif lottery_type == 'ssq':
+            amounts = dict(SSQ_FIXED)
+        else:
+            amounts = dict(D3_FIXED)
+            for total, money in D3_SUM_FIXED.items():
+                amounts[d3_sum_tier(total)] = amounts[d3_sum_tier(27 - total)] = money
+        levels = SSQ_LEVELS if lottery_type == 'ssq' else D3_LEVELS
+
+        for grade in (info or {}).get('prizegrades') or []:
+            money = _money(grade.get('typemoney'))
+            if money is None:
+                continue
+            prize_type = str(grade.get('type'))
+            if lottery_type == 'kl8':
+                match = _KL8_TYPE.fullmatch(prize_type)
+                if match:
+                    amounts[kl8_tier(int(match.group(1)), int(match.group(2)))] = money
+            elif prize_type.isdigit() and 1 <= int(prize_type) <= len(levels):
+                amounts[levels[int(prize_type) - 1]] = money
+        return cls(amounts)
+
+    def amount(self, level):
+        """奖级的单注奖金，未中奖或未知奖级为0"""
+        if level == NO_PRIZE:
+            return 0
+        return self._amounts.get(level, 0)
+
+    def kl8(self, picks, hits):
+        """快乐8 选picks中hits 的单注奖金"""
+        return self.amount(kl8_tier(picks, hits))
+
+    def __contains__(self, level):
+        return level in self._amounts
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+按主机的令牌桶限流
+
+同一进程内对同一主机的所有请求共享一个令牌桶和并发上限，
+避免并发、多账号签到时短时间内集中请求同一站点。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from common.http_pool import host_of
+
+
+class TokenBucket:
+    """令牌桶，rate 为每秒补充的令牌数（<=0 表示不限速），burst 为桶容量"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不足时预占并等待，返回等待秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """按主机限流：每秒请求数 rate、突发 burst、同时进行的请求数 concurrency
+
+    on_wait(host, seconds) 在请求因限流等待后调用，可用于统计。
+    """
+
+    def __init__(self, rate=2.0, burst=4, concurrency=4, on_wait=None):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = max(1, concurrency)
+        self.on_wait = on_wait
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, host):
+        with self._lock:
+            limits = self._hosts.get(host)
+            if limits is None:
+                limits = (threading.BoundedSemaphore(self.concurrency),
+                          TokenBucket(self.rate, self.burst))
+                self._hosts[host] = limits
+            return limits
+
+    @contextmanager
+    def slot(self, url):
+        """占用 URL 所属主机的一个请求名额，返回等待秒数"""
+        host = host_of(url)
+        semaphore, bucket = self._limits(host)
+        start = time.monotonic()
+        with semaphore:
+            bucket.acquire()
+            waited = time.monotonic() - start
+            if waited >= 0.001 and self.on_wait:
+                self.on_wait(host, waited)
+            yield waited
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+通用重试策略
+
+- 指数退避 + 随机抖动，429/503 优先遵循 Retry-After
+- 只重试超时、连接错误、5xx、429 等可恢复的异常
+- 按主机熔断：连续失败达到阈值后，冷却期内直接跳过该主机，
+  状态写入文件，跨次运行生效
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from common.state import persist
+
+logger = logging.getLogger(__name__)
+
+
+class RetryError(Exception):
+    """重试次数耗尽"""
+
+
+class CircuitOpenError(Exception):
+    """主机处于熔断状态"""
+
+
+def retry_after(exc):
+    """解析异常响应中的 Retry-After 秒数"""
+    from email.utils import parsedate_to_datetime
+
+    response = getattr(exc, 'response', None)
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc):
+    """判断是否为可恢复的网络异常"""
+    # 只在出现异常时才需要，延迟导入
+    import requests
+
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError,
+                        requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+class CircuitBreaker:
+    """按主机统计连续失败次数的熔断器"""
+
+    def __init__(self, path=None, threshold=3, cooldown=3600):
+        self.path = path
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._state = None  # 首次使用时读取
+
+    @property
+    def _hosts(self):
+        """各主机的熔断状态，首次访问时读取文件，调用方需持有锁"""
+        if self._state is None:
+            self._state = self._load()
+        return self._state
+
+    def _load(self):
+        """读取熔断状态文件"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning(f'熔断状态读取失败: {e}')
+            return {}
+
+    def allow(self, host):
+        """主机是否允许请求，冷却期过后放行一次试探请求"""
+        with self._lock:
+            state = self._hosts.get(host)
+            return not state or state.get('open_until', 0) <= time.time()
+
+    def record_success(self, host):
+        """请求成功，清除失败计数"""
+        with self._lock:
+            if self._hosts.pop(host, None) is not None:
+                self._dirty = True
+
+    def record_failure(self, host):
+        """请求失败，达到阈值后打开熔断"""
+        with self._lock:
+            state = self._hosts.setdefault(host, {'failures': 0, 'open_until': 0})
+            state['failures'] += 1
+            if state['failures'] >= self.threshold:
+                state['open_until'] = time.time() + self.cooldown
+                logger.warning(f'{host} 连续失败{state["failures"]}次，'
+                               f'熔断{self.cooldown}秒')
+            self._dirty = True
+
+    def save(self):
+        """保存熔断状态，常驻进程中延迟到 state.flush()"""
+        persist(self._write)
+
+    def _write(self):
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._state, f, indent=2)
+                self._dirty = False
+            except IOError as e:
+                logger.warning(f'熔断状态保存失败: {e}')
+
+
+class RetryPolicy:
+    """重试策略，可直接作为装饰器使用
+
+    被装饰方法所属对象的 host 属性用于熔断判断；
+    on_retry(host, exc, wait) 在每次重试等待前调用。
+    """
+
+    def __init__(self, max_retries=3, base_delay=1, max_delay=30, jitter=0.5,
+                 retry_on=(), breaker=None, on_retry=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_on = tuple(retry_on)
+        self.breaker = breaker
+        self.on_retry = on_retry
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            host = getattr(args[0], 'host', None) if args else None
+            return self.call(func, args, kwargs, host)
+        return wrapper
+
+    def should_retry(self, exc):
+        """判断异常是否需要重试"""
+        return is_retryable(exc) or isinstance(exc, self.retry_on)
+
+    def delay(self, attempt, exc=None):
+        """计算第 attempt 次失败后的等待时间，返回 None 表示放弃重试"""
+        wait = retry_after(exc)
+        if wait is not None:
+            return wait if wait <= self.max_delay else None
+        wait = min(self.base_delay * 2 ** attempt, self.max_delay)
+        return wait + random.uniform(0, wait * self.jitter)
+
+    def call(self, func, args=(), kwargs=None, host=None):
+        """按策略执行 func"""
+        kwargs = kwargs or {}
+        breaker = self.breaker if host else None
+        last_error = None
+        attempts = 0
+        for attempt in range(self.max_retries):
+            if breaker and not breaker.allow(host):
+                raise CircuitOpenError(f'{host} 熔断中，跳过请求')
+            attempts += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(e):
+                    raise
+                last_error = e
+                if attempt + 1 >= self.max_retries:
+                    break
+                wait = self.delay(attempt, e)
+                if wait is None:
+                    break
+                logger.warning(f'{e.__class__.__name__}: {e}，'
+                               f'{wait:.1f}秒后重试 ({attempt + 1}/{self.max_retries})')
+                if self.on_retry:
+                    self.on_retry(host, e, wait)
+                time.sleep(wait)
+            else:
+                if breaker:
+                    breaker.record_success(host)
+                return result
+
+        if breaker and is_retryable(last_error):
+            breaker.record_failure(host)
+        raise RetryError(f'尝试{attempts}次后失败: {last_error}') from last_error
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+状态文件的延迟保存
+
+单次运行的脚本每次 save 都立即写文件；常驻进程（ql_daemon.py）中
+调用 defer() 后，save 只登记待写任务，由 flush() 定期及退出时统一写出，
+状态在两次运行之间留在内存中。
+
+PageCache、CircuitBreaker 自行保存内存中的状态，通过 persist() 登记写入函数；
+签到/彩票记录、.due 索引和运行指标通过 load_json()/save_file() 读写，
+延迟模式下保存的内容留在内存中，之后的读取直接返回，不再读文件。
+"""
+
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_deferred = False
+_pending = {}  # 写入函数 -> None，按登记顺序去重
+_documents = {}  # 路径 -> 尚未写出或已写出的最新内容，仅延迟模式使用
+_writers = {}  # 路径 -> 写入函数，同一文件多次保存只写一次
+_lock = threading.Lock()
+
+
+def defer(enabled=True):
+    """开启/关闭延迟保存，关闭时立即写出待写状态"""
+    global _deferred
+    _deferred = enabled
+    if not enabled:
+        flush()
+        with _lock:
+            _documents.clear()
+
+
+def persist(writer):
+    """保存状态：延迟模式下登记 writer，否则立即执行"""
+    if _deferred:
+        with _lock:
+            _pending[writer] = None
+        return
+    writer()
+
+
+def flush():
+    """写出所有待写状态"""
+    with _lock:
+        writers = list(_pending)
+        _pending.clear()
+    for writer in writers:
+        try:
+            writer()
+        except Exception as e:
+            logger.warning(f'状态保存失败: {e}')
+
+
+def load_json(path, default=None):
+    """读取 JSON 状态文件，文件不存在时返回 default；延迟模式下优先返回内存中的内容"""
+    with _lock:
+        text = _documents.get(path)
+    if text is None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return default
+    return json.loads(text)
+
+
+def save_json(path, data, **dump_options):
+    """保存 JSON 状态文件，dump_options 传给 json.dumps"""
+    save_file(path, json.dumps(data, **dump_options))
+
+
+def save_file(path, text):
+    """保存文本文件：先写临时文件再替换，延迟模式下只更新内存并登记写入"""
+    if not _deferred:
+        with _lock:
+            _documents.pop(path, None)
+        _replace(path, text)
+        return
+    with _lock:
+        _documents[path] = text
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = lambda: _replace(path, _documents[path])
+    persist(writer)
+
+
+def _replace(path, text):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
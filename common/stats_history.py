@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+账号数据时间序列存储（SQLite）
+
+每次签到后的分享率、上传/下载量（字节）、魔力值等写入 samples 表，
+同时增量维护按天汇总的 daily 表，按周汇总由 daily 表计算。
+两张表的主键均以 (source, account, metric, 时间) 开头，范围查询走索引。
+
+查询示例：
+    python -m common.stats_history gain PT HDTIME magic --days 90
+    python -m common.stats_history rollup FN 1 total_reward --period week
+"""
+
+import re
+import time
+from contextlib import closing
+
+DB_FILE = 'stats_history.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS samples (
+    source TEXT NOT NULL,
+    account TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (source, account, metric, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily (
+    source TEXT NOT NULL,
+    account TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day TEXT NOT NULL,
+    first REAL NOT NULL,
+    last REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (source, account, metric, day)
+) WITHOUT ROWID;
+'''
+
+UPSERT_DAILY = '''
+INSERT INTO daily (source, account, metric, day, first, last, min, max, count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (source, account, metric, day) DO UPDATE SET
+    last = excluded.last,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    count = count + 1
+'''
+
+SIZE_UNITS = {
+    'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3,
+    'TB': 1024 ** 4, 'PB': 1024 ** 5, 'EB': 1024 ** 6,
+}
+_SIZE_PATTERN = re.compile(r'([\d.,]+)\s*([KMGTPE]?)I?B', re.IGNORECASE)
+
+
+def parse_number(value):
+    """解析数字（支持千分位），无法解析时返回 None"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def parse_size(value):
+    """解析 1.5TB、300 GiB 等容量为字节数，无法解析时返回 None"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _SIZE_PATTERN.search(str(value))
+    if not match:
+        return None
+    number = parse_number(match.group(1))
+    if number is None:
+        return None
+    return number * SIZE_UNITS[match.group(2).upper() + 'B']
+
+
+def _day(ts):
+    return time.strftime('%Y-%m-%d', time.localtime(ts))
+
+
+class StatsHistory:
+    """账号数据时间序列"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+
+    def _connect(self):
+        import sqlite3
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record(self, source, account, values, ts=None):
+        """写入一组指标，值为 None 的指标忽略"""
+        ts = int(ts if ts is not None else time.time())
+        day = _day(ts)
+        rows = [(metric, float(value)) for metric, value in values.items()
+                if value is not None]
+        if not rows:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)',
+                [(source, account, metric, ts, value) for metric, value in rows]
+            )
+            conn.executemany(
+                UPSERT_DAILY,
+                [(source, account, metric, day, value, value, value, value)
+                 for metric, value in rows]
+            )
+
+    def series(self, source, account, metric, start=None, end=None):
+        """原始采样 [(ts, value)]，start/end 为时间戳"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                'SELECT ts, value FROM samples '
+                'WHERE source = ? AND account = ? AND metric = ? '
+                'AND ts >= ? AND ts <= ? ORDER BY ts',
+                (source, account, metric,
+                 start if start is not None else 0,
+                 end if end is not None else 2 ** 62)
+            ).fetchall()
+
+    def rollup(self, source, account, metric, period='day',
+               start_day='0000-00-00', end_day='9999-99-99'):
+        """按天/周汇总 [(周期, first, last, min, max)]"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT day, first, last, min, max FROM daily '
+                'WHERE source = ? AND account = ? AND metric = ? '
+                'AND day >= ? AND day <= ? ORDER BY day',
+                (source, account, metric, start_day, end_day)
+            ).fetchall()
+        if period == 'day':
+            return rows
+        if period != 'week':
+            raise ValueError(f'不支持的汇总周期: {period}')
+
+        import datetime
+
+        weeks = {}
+        for day, first, last, low, high in rows:
+            year, week, _ = datetime.date.fromisoformat(day).isocalendar()
+            key = f'{year}-W{week:02d}'
+            if key not in weeks:
+                weeks[key] = [key, first, last, low, high]
+            else:
+                item = weeks[key]
+                item[2] = last
+                item[3] = min(item[3], low)
+                item[4] = max(item[4], high)
+        return [tuple(item) for item in weeks.values()]
+
+    def gain_per_day(self, source, account, metric, days=90):
+        """最近 days 天每天的增量 [(day, gain)]，以前一天的最后值为基准"""
+        start_day = _day(time.time() - days * 86400)
+        with closing(self._connect()) as conn:
+            previous = conn.execute(
+                'SELECT last FROM daily '
+                'WHERE source = ? AND account = ? AND metric = ? AND day < ? '
+                'ORDER BY day DESC LIMIT 1',
+                (source, account, metric, start_day)
+            ).fetchone()
+        baseline = previous[0] if previous else None
+        gains = []
+        for day, first, last, _, _ in self.rollup(
+                source, account, metric, start_day=start_day):
+            gains.append((day, last - (baseline if baseline is not None else first)))
+            baseline = last
+        return gains
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='账号数据历史查询')
+    parser.add_argument('--db', default=DB_FILE)
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('gain', 'rollup', 'series'):
+        cmd = sub.add_parser(name)
+        cmd.add_argument('source')
+        cmd.add_argument('account')
+        cmd.add_argument('metric')
+        cmd.add_argument('--days', type=int, default=90)
+        cmd.add_argument('--period', choices=('day', 'week'), default='day')
+    args = parser.parse_args()
+
+    history = StatsHistory(args.db)
+    if args.command == 'gain':
+        rows = history.gain_per_day(args.source, args.account, args.metric, args.days)
+    elif args.command == 'rollup':
+        rows = history.rollup(args.source, args.account, args.metric, args.period,
+                              start_day=_day(time.time() - args.days * 86400))
+    else:
+        rows = history.series(args.source, args.account, args.metric,
+                              start=time.time() - args.days * 86400)
+    for row in rows:
+        print(*row, sep='\t')
+
+
+if __name__ == '__main__':
+    main()
@@ -11,11 +11,23 @@ import os
 import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Union
-import requests
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import re
 
+from common import state
+from common.draw_archive import DrawArchive, follows
+from common.http_pool import get_session
+from common.lottery_match import (
+    D3_PLAYS, NO_PRIZE, D3Tickets, KL8Tickets, SSQTickets, parse_ssq_compound,
+    ssq_compound
+)
+from common.metrics import RunMetrics
+from common.notify_spool import NotifySpool
+from common.prize_table import PrizeTable
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -31,28 +43,109 @@ LOTTERY_APIS = {
                 'findDrawNotice'),
         'params': {'name': 'ssq', 'pageNo': '1', 'pageSize': '1'},
         'env_key': 'LOTTERY_SSQ',
-        'draw_days': [2, 4, 7]  # 周二、四、日开奖
+        'draw_days': [2, 4, 7],  # 周二、四、日开奖
+        'draw_time': '21:15'
     },
     '3d': {
         'url': ('http://www.cwl.gov.cn/cwl_admin/front/cwlkj/search/kjxx/'
                 'findDrawNotice'),
         'params': {'name': '3d', 'pageNo': '1', 'pageSize': '1'},
         'env_key': 'LOTTERY_3D',
-        'draw_days': list(range(1, 8))  # 每天开奖
+        'draw_days': list(range(1, 8)),  # 每天开奖
+        'draw_time': '21:15'
     },
     'kl8': {
         'url': ('http://www.cwl.gov.cn/cwl_admin/front/cwlkj/search/kjxx/'
                 'findDrawNotice'),
         'params': {'name': 'kl8', 'pageNo': '1', 'pageSize': '1'},
         'env_key': 'LOTTERY_KL8',
-        'draw_days': list(range(1, 8))  # 每天开奖
+        'draw_days': list(range(1, 8)),  # 每天开奖
+        'draw_time': '21:30'
     }
 }
 
+# 开奖后到接口公布结果的预留时间（分钟）
+PUBLISH_LAG = int(os.getenv('LOTTERY_PUBLISH_LAG', '60'))
+# 休市区间，如春节：2026-02-15~2026-02-23，多个区间用逗号分隔
+SUSPEND = os.getenv('LOTTERY_SUSPEND', '')
+
+# 多注号码的分隔符
+TICKET_SEPARATOR = re.compile(r'[;&\n]')
+# 报告中最多列出的中奖号码数
+REPORT_WINNERS = 20
+# 历史记录中最多保留的中奖号码数，大批量票据只按奖级记录注数
+HISTORY_NUMBERS = 100
+
+# 回填开奖历史时每页期数和翻页间隔（秒）
+BACKFILL_PAGE_SIZE = 100
+BACKFILL_INTERVAL = 1
+
+# 请求超时时间（秒）
+REQUEST_TIMEOUT = 10
+
+# 运行指标
+METRICS = RunMetrics('lottery')
+SPOOL = NotifySpool()
+
+
+class DrawCalendar:
+    """开奖日历：开奖星期、开奖时间、公布延迟和休市区间"""
+
+    def __init__(self, draw_days: List[int], draw_time: str = '21:15',
+                 publish_lag: int = PUBLISH_LAG, suspensions: str = SUSPEND):
+        self.draw_days = set(draw_days)
+        self.draw_time = datetime.strptime(draw_time, '%H:%M').time()
+        self.publish_lag = timedelta(minutes=publish_lag)
+        self.suspensions = self.parse_suspensions(suspensions)
+
+    @classmethod
+    def for_type(cls, lottery_type: str) -> 'DrawCalendar':
+        """按 LOTTERY_APIS 中的配置创建日历"""
+        api_info = LOTTERY_APIS[lottery_type]
+        return cls(api_info['draw_days'], api_info.get('draw_time', '21:15'))
+
+    @staticmethod
+    def parse_suspensions(text: str) -> List[tuple]:
+        """解析休市区间，格式 开始日期~结束日期，逗号分隔"""
+        suspensions = []
+        for part in filter(None, (p.strip() for p in text.split(','))):
+            start, _, end = part.partition('~')
+            try:
+                suspensions.append((date.fromisoformat(start.strip()),
+                                    date.fromisoformat((end or start).strip())))
+            except ValueError:
+                logger.error(f"休市区间格式错误: {part}")
+        return suspensions
+
+    def is_draw_day(self, day: date) -> bool:
+        """是否为开奖日"""
+        if day.isoweekday() not in self.draw_days:
+            return False
+        return not any(start <= day <= end for start, end in self.suspensions)
+
+    def latest_draw(self, now: Optional[datetime] = None) -> Optional[date]:
+        """截至 now 已公布结果的最近一期开奖日期"""
+        now = now or datetime.now()
+        day = now.date()
+        for _ in range(366):
+            if self.is_draw_day(day) and \
+                    datetime.combine(day, self.draw_time) + self.publish_lag <= now:
+                return day
+            day -= timedelta(days=1)
+        return None
+
+    def has_new_draw(self, last_check_date: str, now: Optional[datetime] = None) -> bool:
+        """上次检查后是否可能有新的开奖结果"""
+        latest = self.latest_draw(now)
+        return latest is not None and latest.isoformat() > last_check_date.split(' ')[0]
+
 
 class LotteryChecker:
     def __init__(self):
         self.data = self.init_data_file()
+        # 本次运行内的开奖信息缓存，同一彩种只请求一次
+        self._draws: Dict[str, Optional[Dict]] = {}
+        self._draws_lock = threading.Lock()
     
     @staticmethod
     def init_data_file() -> Dict:
@@ -87,11 +180,11 @@ class LotteryChecker:
         }
 
         try:
-            if not os.path.exists(JSON_FILE_NAME):
-                with open(JSON_FILE_NAME, 'w', encoding='utf-8') as f:
-                    json.dump(default_data, f, indent=2)
-            with open(JSON_FILE_NAME, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            data = state.load_json(JSON_FILE_NAME)
+            if data is None:
+                state.save_json(JSON_FILE_NAME, default_data, indent=2)
+                data = default_data
+            return data
         except IOError as e:
             logger.error(f"文件操作失败: {str(e)}")
             return default_data
@@ -134,229 +227,319 @@ class LotteryChecker:
         logger.info("开奖日期不新，无需检查")
         return False
 
-    def get_lottery_numbers(self, lottery_type: str) -> Optional[List[str]]:
-        """从环境变量获取彩票号码，并根据彩票类型进行格式化"""
+    def needs_check(self, lottery_type: str) -> bool:
+        """按开奖日历判断是否需要请求开奖信息"""
+        last_check_date = self.data['types'][lottery_type]['last_check_date']
+        return DrawCalendar.for_type(lottery_type).has_new_draw(last_check_date)
+
+    def get_lottery_numbers(self, lottery_type: str) -> Optional[List[List[str]]]:
+        """读取彩票号码，返回号码列表的列表（每注一个）
+
+        环境变量中多注号码用 ;、& 或换行分隔，号码之间用逗号分隔；
+        大量号码可写入文件，由 <环境变量>_FILE 指定路径，每行一注。
+        双色球复式/胆拖（含 +）原样保留为单个元素，兑奖时再解析；
+        3D 非直选玩法以 `玩法:` 开头（如 `组六:1,2,3`、`和值:10`），玩法作为第一个元素。
+        """
         env_key = LOTTERY_APIS[lottery_type]['env_key']
-        numbers = os.getenv(env_key)
-        if not numbers:
-            return None
-        
-        try:
-            if lottery_type == '3d':
-                # 3D彩票去掉前导零
-                return [str(int(num)) for num in numbers.split(',')]
-            else:
-                # 其他彩票补全为两位数格式
-                return [f"{int(num):02}" for num in numbers.split(',')]
-        except Exception as e:
-            logger.error(
-                f"解析{lottery_type}彩票号码失败: {numbers}, 错误: {str(e)}"
-            )
-            return None
+        lines = TICKET_SEPARATOR.split(os.getenv(env_key, ''))
+        file_path = os.getenv(f'{env_key}_FILE')
+        if file_path:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    lines.extend(f.read().splitlines())
+            except IOError as e:
+                logger.error(f"读取{lottery_type}号码文件失败: {str(e)}")
+
+        tickets = []
+        for line in filter(None, (line.strip() for line in lines)):
+            try:
+                if lottery_type == 'ssq' and '+' in line:
+                    tickets.append([line.replace(' ', '')])
+                elif lottery_type == '3d':
+                    # 3D彩票去掉前导零
+                    play, _, line = line.replace('：', ':').rpartition(':')
+                    numbers = [str(int(num)) for num in line.split(',')]
+                    tickets.append([play.strip()] + numbers if play else numbers)
+                else:
+                    # 其他彩票补全为两位数格式
+                    tickets.append([f"{int(num):02}" for num in line.split(',')])
+            except ValueError as e:
+                logger.error(
+                    f"解析{lottery_type}彩票号码失败: {line}, 错误: {str(e)}"
+                )
+        return tickets or None
+
+    def prefetch(self, lottery_types: List[str]) -> None:
+        """并发获取多个彩种的开奖信息"""
+        with ThreadPoolExecutor(max_workers=max(1, len(lottery_types))) as executor:
+            list(executor.map(self.get_latest_lottery_info, lottery_types))
 
     def get_latest_lottery_info(self, lottery_type: str) -> Optional[Dict]:
-        """获取最新开奖信息"""
+        """获取最新开奖信息，本次运行内已获取过时直接返回"""
+        with self._draws_lock:
+            if lottery_type in self._draws:
+                return self._draws[lottery_type]
+        result = self._fetch_lottery_info(lottery_type)
+        with self._draws_lock:
+            return self._draws.setdefault(lottery_type, result)
+
+    def _fetch_lottery_info(self, lottery_type: str) -> Optional[Dict]:
+        results = self._fetch_draws(lottery_type)
+        if not results:
+            return None
+        result = results[0]
+        self._archive_latest(lottery_type, result)
+        return result
+
+    @staticmethod
+    def _archive_latest(lottery_type: str, result: Dict) -> None:
+        """已建立历史归档时顺带追加最新一期，与归档末尾不连续时留给回填补齐"""
+        archive = DrawArchive(lottery_type)
+        try:
+            last = archive.last_issue()
+            if not last:
+                return
+            issue = int(result['code'])
+            if issue > last and not follows(last, issue):
+                logger.info(f"{lottery_type.upper()}归档缺少{last}之后的开奖，"
+                            f"运行 --backfill 补齐后再追加")
+                return
+            archive.append([result])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"追加{lottery_type}开奖归档失败: {str(e)}")
+        finally:
+            archive.close()
+
+    def _fetch_draws(self, lottery_type: str, page_no: int = 1,
+                     page_size: int = 1) -> Optional[List[Dict]]:
+        """按页获取开奖公告，从最新一期开始"""
         api_info = LOTTERY_APIS[lottery_type]
         headers = {
             'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
                           'AppleWebKit/537.36')
         }
-        
+        params = dict(api_info['params'], pageNo=str(page_no), pageSize=str(page_size))
+
+        with METRICS.site(lottery_type), \
+                METRICS.timer(lottery_type, 'draw_info'):
+            try:
+                response = get_session(api_info['url']).get(
+                    api_info['url'],
+                    headers=headers,
+                    params=params,
+                    timeout=REQUEST_TIMEOUT
+                )
+                response.raise_for_status()
+                data = response.json()
+
+                results = data['result']
+                METRICS.inc(lottery_type, 'draw_info', 'ok')
+                return results
+            except Exception as e:
+                METRICS.inc(lottery_type, 'draw_info', e.__class__.__name__)
+                logger.error(
+                    f"获取{lottery_type}开奖信息失败: {str(e)}"
+                )
+                return None
+
+    def backfill(self, lottery_type: str) -> int:
+        """逐页获取开奖历史写入归档，返回新增期数
+
+        从最新一期往前翻，直到接上归档（归档有缺期时翻到最早的缺口）或历史尽头；
+        中途获取失败时本次不写入，避免留下之后无法补齐的缺口。
+        """
+        archive = DrawArchive(lottery_type)
         try:
-            response = requests.get(
-                api_info['url'],
-                headers=headers,
-                params=api_info['params']
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            return data['result'][0]
-        except Exception as e:
-            logger.error(
-                f"获取{lottery_type}开奖信息失败: {str(e)}"
-            )
+            gap = archive.first_gap()
+            stop = gap if gap is not None else archive.last_issue()
+            draws = {}
+            page_no = 1
+            while True:
+                results = self._fetch_draws(lottery_type, page_no, BACKFILL_PAGE_SIZE)
+                if results is None:
+                    logger.error(f"{lottery_type.upper()}第{page_no}页获取失败，本次不写入归档")
+                    return 0
+                new = [result for result in results if int(result['code']) not in draws]
+                draws.update((int(result['code']), result) for result in new)
+                logger.info(f"{lottery_type.upper()}第{page_no}页: {len(new)}期")
+                # 已翻到归档末尾（或缺口）之前，或到了历史尽头（空页、重复返回同一页）
+                if not new or any(int(result['code']) <= stop for result in results):
+                    break
+                page_no += 1
+                time.sleep(BACKFILL_INTERVAL)
+            return archive.append(draws.values())
+        finally:
+            archive.close()
+
+    def check_ssq(self, tickets: List[List[str]]) -> Optional[Dict]:
+        """检查双色球中奖，复式/胆拖按组合数计算，不展开为单式"""
+        latest_info = self.get_latest_lottery_info('ssq')
+        if not latest_info:
             return None
 
-    def check_ssq(self, my_numbers: List[str]) -> Dict:
-        """检查双色球中奖"""
-        latest_info = self.get_latest_lottery_info('ssq')
-        if not latest_info or len(my_numbers) != 7:
+        book = SSQTickets()
+        singles, compounds = [], []
+        for numbers in tickets:
+            try:
+                if len(numbers) == 1 and '+' in numbers[0]:
+                    compounds.append((numbers, parse_ssq_compound(numbers[0])))
+                else:
+                    book.add(numbers[:-1], numbers[-1])
+                    singles.append(numbers)
+            except (ValueError, IndexError):
+                logger.error(f"双色球号码格式不正确: {numbers}")
+        if not singles and not compounds:
             return None
 
         winning_numbers = latest_info['red'].split(',') + [latest_info['blue']]
-        my_red_numbers = my_numbers[:-1]
-        my_blue_number = my_numbers[-1]
-
-        red_matches = len(set(my_red_numbers) & set(winning_numbers[:-1]))
-        blue_matches = my_blue_number == winning_numbers[-1]
-
-        prize_level = self._calculate_ssq_prize(red_matches, blue_matches)
-        
-        return {
-            'date': latest_info['date'],
-            'winning_numbers': winning_numbers,
-            'my_numbers': my_numbers,
-            'prize_level': prize_level,
-            'prize_amount': self._get_prize_amount(prize_level, latest_info)
-        }
-
-    def check_3d(self, my_numbers: List[str]) -> Dict:
-        """检查福彩3D中奖"""
+        reds, blue = winning_numbers[:-1], winning_numbers[-1]
+        valid = singles + [numbers for numbers, _ in compounds]
+        histogram, winners = {}, []
+        if singles:
+            result = book.match(reds, blue)
+            histogram.update(result.histogram)
+            winners.extend((index, level, 1) for index, level in result.winners)
+        for index, (_, (dan, tuo, blues)) in enumerate(compounds, len(singles)):
+            for level, count in ssq_compound(dan, tuo, blues, reds, blue).items():
+                histogram[level] = histogram.get(level, 0) + count
+                if level != NO_PRIZE:
+                    winners.append((index, level, count))
+
+        return self._summarize(latest_info, winning_numbers, valid, histogram,
+                               winners, PrizeTable.for_draw('ssq', latest_info))
+
+    def check_3d(self, tickets: List[List[str]]) -> Optional[Dict]:
+        """检查福彩3D中奖，支持直选、组三、组六、和值、组三包号、组六包号"""
         latest_info = self.get_latest_lottery_info('3d')
-        if not latest_info or len(my_numbers) != 3:
+        if not latest_info:
+            return None
+
+        book = D3Tickets()
+        valid = []
+        for numbers in tickets:
+            try:
+                if numbers[0] in D3_PLAYS:
+                    book.add(numbers[1:], numbers[0])
+                else:
+                    book.add(numbers)
+                valid.append(numbers)
+            except ValueError:
+                logger.error(f"3D号码格式不正确: {numbers}")
+        if not valid:
             return None
 
         winning_numbers = latest_info['red'].split(',')
-        matches = sum(1 for my, win in zip(my_numbers, winning_numbers)
-                      if my == win)
-        
-        prize_level = self._calculate_3d_prize(matches)
-        
-        return {
-            'date': latest_info['date'],
-            'winning_numbers': winning_numbers,
-            'my_numbers': my_numbers,
-            'prize_level': prize_level,
-            'prize_amount': 1040 if prize_level == "中奖" else 0
-        }
+        result = book.match(winning_numbers)
+        return self._summarize(
+            latest_info, winning_numbers, valid, result.histogram,
+            [(index, level, 1) for index, level in result.winners],
+            PrizeTable.for_draw('3d', latest_info)
+        )
 
-    def check_kl8(self, my_numbers: List[str], play_type: int) -> Dict:
-        """检查快乐8中奖，支持从选一到选十的不同玩法"""
-        logger.info(f"检查快乐8彩票，用户号码: {my_numbers}, 玩法: 选{play_type}")
-        
+    def check_kl8(self, tickets: List[List[str]]) -> Optional[Dict]:
+        """检查快乐8中奖，每注选一到选十，玩法由号码个数决定"""
         latest_info = self.get_latest_lottery_info('kl8')
         if not latest_info:
             logger.error("未能获取快乐8的最新开奖信息")
             return None
-        if len(my_numbers) != play_type:
-            logger.error(f"快乐8号码数量不正确，应为{play_type}个")
+
+        book = KL8Tickets()
+        valid = []
+        for numbers in tickets:
+            try:
+                book.add(numbers)
+                valid.append(numbers)
+            except ValueError as e:
+                logger.error(f"快乐8号码无效（{e}）: {numbers}")
+        if not valid:
             return None
 
         winning_numbers = latest_info['red'].split(',')
         logger.info(f"快乐8中奖号码: {winning_numbers}")
+        result = book.match(winning_numbers)
 
-        matches = len(set(my_numbers) & set(winning_numbers))
-        logger.info(f"匹配的号码数量: {matches}")
-
-        prize_level = f'x{play_type}z{matches}'
-        
-        prize_info = next(
-            (item for item in latest_info.get('prizegrades', [])
-             if item['type'] == prize_level),
-            None
+        return self._summarize(
+            latest_info, winning_numbers, valid, result.histogram,
+            [(index, level, 1) for index, level in result.winners],
+            PrizeTable.for_draw('kl8', latest_info)
         )
-        if prize_info:
-
-            return {
-                'date': latest_info['date'],
-                'winning_numbers': winning_numbers,
-                'my_numbers': my_numbers,
-                'prize_level': prize_level,
-                'prize_amount': prize_info['typemoney']
-            }
+
+    @staticmethod
+    def _summarize(latest_info: Dict, winning_numbers: List[str],
+                   tickets: List[List[str]], histogram: Dict[str, int],
+                   winners: List[tuple], prizes: PrizeTable) -> Dict:
+        """汇总兑奖结果，单注时与逐注检查的输出一致
+
+        histogram 为 {奖级: 注数}，winners 为 [(号码序号, 奖级, 注数)]。
+        """
+        winners = [
+            {'numbers': tickets[index], 'level': level, 'count': count,
+             'amount': prizes.amount(level) * count}
+            for index, level, count in winners
+        ]
+
+        bets = sum(histogram.values())
+        my_numbers = tickets[0] if len(tickets) == 1 else [f'共{bets}注']
+        won = {winner['level'] for winner in winners}
+        won_histogram = {level: count for level, count in histogram.items()
+                         if level in won}
+        if bets == 1:
+            prize_level = next(iter(histogram))
+        else:
+            prize_level = '、'.join(
+                f'{level}（{count}注）' for level, count in won_histogram.items()
+            ) or NO_PRIZE
+
         return {
             'date': latest_info['date'],
             'winning_numbers': winning_numbers,
             'my_numbers': my_numbers,
             'prize_level': prize_level,
-            'prize_amount': 0
+            # 快乐8选一奖金为4.6元，合计保留两位小数
+            'prize_amount': round(sum(w['amount'] for w in winners), 2),
+            'tickets': bets,
+            'histogram': won_histogram,
+            'winners': winners,
         }
 
-    @staticmethod
-    def _calculate_ssq_prize(red_matches: int, blue_matches: bool) -> str:
-        """计算双色球中奖等级"""
-        if red_matches == 6 and blue_matches:
-            return "一等奖"
-        elif red_matches == 6:
-            return "二等奖"
-        elif red_matches == 5 and blue_matches:
-            return "三等奖"
-        elif red_matches == 5 or (red_matches == 4 and blue_matches):
-            return "四等奖"
-        elif red_matches == 4 or (red_matches == 3 and blue_matches):
-            return "五等奖"
-        elif blue_matches:
-            return "六等奖"
-        return "未中奖"
-
-    @staticmethod
-    def _calculate_3d_prize(matches: int) -> str:
-        """计算福彩3D中奖等级"""
-        if matches == 3:
-            return "中奖"
-        else:
-            return "未中奖"
-
-    @staticmethod
-    def _calculate_kl8_prize(matches: int, play_type: int, prizegrades: List[Dict]) -> Dict[str, str]:
-        """计算快乐8中奖结果，返回匹配的号码数量和类型"""
-        prize_type = f"x{matches}z{play_type}"
-        prize_info = next(
-            (item for item in prizegrades if item['type'] == prize_type),
-            None
-        )
-        if prize_info:
-            return {"type": prize_type, "typemoney": prize_info['typemoney']}
-        return {"type": prize_type, "typemoney": "0"}
-
-    def _get_prize_amount(self, prize_level: str, lottery_info: Dict) -> float:
-        """获取奖金金额"""
-        if prize_level == "未中奖":
-            return 0
-        # 替换中文数字为阿拉伯数字
-        prize_level = prize_level.replace(
-            "一", "1"
-        ).replace("二", "2").replace("三", "3").replace(
-            "四", "4"
-        ).replace("五", "5").replace("六", "6")[0]
-
-        try:
-            prize_info = next(
-                (item for item in lottery_info.get('prizegrades', [])
-                 if item['type'] == int(prize_level)),
-                None
-            )
-            return prize_info['typemoney'] if prize_info else 0
-        except Exception as e:
-            logger.error(f"获取奖金金额失败: {str(e)}")
-            return 0
-
     def _update_history(self, lottery_type: str, result: Dict) -> None:
         """更新中奖历史记录"""
         try:
-            with open(JSON_FILE_NAME, 'r+', encoding='utf-8') as f:
-                data = json.load(f)
-                lottery_data = data['types'][lottery_type]
+            data = state.load_json(JSON_FILE_NAME)
+            lottery_data = data['types'][lottery_type]
+            
+            # 更新最后检查日期
+            lottery_data['last_check_date'] = time.strftime('%Y-%m-%d')
+            
+            # 添加到历史记录：每期记录各奖级注数和合计，中奖号码只保留最近的少量
+            if result['winners']:
+                history = lottery_data['history']
+                history['lottery_numbers'].extend(
+                    winner['numbers'] for winner in result['winners'][:REPORT_WINNERS]
+                )
+                del history['lottery_numbers'][:-HISTORY_NUMBERS]
+                history['rewards'][result['date']] = {
+                    'level': result['prize_level'],
+                    'amount': result['prize_amount'],
+                    'tickets': result['tickets'],
+                    'histogram': result['histogram']
+                }
                 
-                # 更新最后检查日期
-                lottery_data['last_check_date'] = time.strftime('%Y-%m-%d')
+                # 更新总奖金
+                lottery_data['total_rewards'] = round(
+                    lottery_data['total_rewards'] + result['prize_amount'], 2
+                )
                 
-                # 添加到历史记录
-                if result['prize_level'] != "未中奖":
-                    lottery_data['history']['lottery_numbers'].append(
-                        result['my_numbers']
-                    )
-                    lottery_data['history']['rewards'][result['date']] = {
+                # 更新最高奖金记录
+                if result['prize_amount'] > \
+                        lottery_data['max_reward']['money']:
+                    lottery_data['max_reward'] = {
+                        'date': result['date'],
                         'level': result['prize_level'],
-                        'amount': result['prize_amount']
+                        'money': result['prize_amount']
                     }
-                    
-                    # 更新总奖金
-                    lottery_data['total_rewards'] += int(result['prize_amount'])
-                    
-                    # 更新最高奖金记录
-                    if int(result['prize_amount']) > \
-                            lottery_data['max_reward']['money']:
-                        lottery_data['max_reward'] = {
-                            'date': result['date'],
-                            'level': result['prize_level'],
-                            'money': result['prize_amount']
-                        }
-                
-                f.seek(0)
-                json.dump(data, f, indent=2)
-                f.truncate()
+            
+            state.save_json(JSON_FILE_NAME, data, indent=2)
         except Exception as e:
             logger.error(f"更新历史记录失败: {str(e)}")
 
@@ -365,12 +548,9 @@ class LotteryChecker:
         try:
             # 去除日期中的星期格式
             draw_date = draw_date[:len(draw_date)-3]
-            with open(JSON_FILE_NAME, 'r+', encoding='utf-8') as f:
-                data = json.load(f)
-                data['types'][lottery_type]['last_draw_date'] = draw_date
-                f.seek(0)
-                json.dump(data, f, indent=2)
-                f.truncate()
+            data = state.load_json(JSON_FILE_NAME)
+            data['types'][lottery_type]['last_draw_date'] = draw_date
+            state.save_json(JSON_FILE_NAME, data, indent=2)
         except Exception as e:
             logger.error(f"更新最后检查开奖日期失败: {str(e)}")
 
@@ -379,34 +559,26 @@ class LotteryChecker:
         try:
             # 去除日期中的星期格式
             check_date = check_date[:len(check_date)-3]
-            with open(JSON_FILE_NAME, 'r+', encoding='utf-8') as f:
-                data = json.load(f)
-                data['types'][lottery_type]['last_check_date'] = check_date
-                f.seek(0)
-                json.dump(data, f, indent=2)
-                f.truncate()
+            data = state.load_json(JSON_FILE_NAME)
+            data['types'][lottery_type]['last_check_date'] = check_date
+            state.save_json(JSON_FILE_NAME, data, indent=2)
         except Exception as e:
             logger.error(f"更新最后检查日期失败: {str(e)}")
 
     @staticmethod
     def _write_json_data(file_path: str, data: Dict) -> None:
         """将数据写入JSON文件"""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        state.save_json(file_path, data, indent=2)
 
 
-def check_lottery(lottery_type: str, numbers: List[str], checker: LotteryChecker, play_type: int = 10) -> Union[Dict, None]:
+def check_lottery(lottery_type: str, tickets: List[List[str]], checker: LotteryChecker) -> Union[Dict, None]:
     """检查指定类型彩票"""
     check_functions = {
         'ssq': checker.check_ssq,
         '3d': checker.check_3d,
         'kl8': checker.check_kl8
     }
-    
-    if lottery_type == 'kl8':
-        result = check_functions[lottery_type](numbers, play_type=play_type)
-    else:
-        result = check_functions[lottery_type](numbers)
+    result = check_functions[lottery_type](tickets)
 
     if result:
         draw_date = result['date'].split(' ')[0]  # 提取日期部分
@@ -439,62 +611,106 @@ def generate_html_report(results):
             f"• 用户号码: {', '.join(result['my_numbers'])}<br>",
             f"• 中奖结果: {result['prize_level']}<br>",
             f"• 中奖金额: {result['prize_amount']}元<br>",
-            "<hr>"
         ])
+        # 多注时列出中奖的号码
+        if result['tickets'] > 1:
+            winners = result['winners']
+            for w in winners[:REPORT_WINNERS]:
+                count = f"×{w['count']}" if w['count'] > 1 else ''
+                html_content.append(
+                    f"&nbsp;&nbsp;{', '.join(w['numbers'])}: {w['level']}{count} {w['amount']}元<br>"
+                )
+            if len(winners) > REPORT_WINNERS:
+                html_content.append(f"&nbsp;&nbsp;……共{len(winners)}项中奖<br>")
+        html_content.append("<hr>")
 
     return ''.join(html_content)
 
 def run():
     """主函数"""
+    METRICS.reset()
     checker = LotteryChecker()
     results = []
-        
-    # 检查各类彩票
+
+    # 按开奖日历筛选可能有新结果的彩种，没有时不联网直接结束
+    configured = {}
     for lottery_type in ['ssq', '3d', 'kl8']:
-        numbers = checker.get_lottery_numbers(lottery_type)
-        if numbers:
-            result = check_lottery(lottery_type, numbers, checker)
-            if result:
-                results.append({
-                    'lottery_type': lottery_type,
-                    'date': result['date'],
-                    'winning_numbers': result['winning_numbers'],
-                    'my_numbers': result['my_numbers'],
-                    'prize_level': result['prize_level'],
-                    'prize_amount': result['prize_amount']
-                })
-        else:
+        tickets = checker.get_lottery_numbers(lottery_type)
+        if not tickets:
             logger.info(f"未配置{lottery_type.upper()}彩票号码，跳过检查")
+        elif checker.needs_check(lottery_type):
+            configured[lottery_type] = tickets
+        else:
+            logger.info(f"{lottery_type.upper()}上次检查后没有新的开奖，跳过")
+    if not configured:
+        SPOOL.flush()
+        return
+
+    # 并发获取开奖信息
+    checker.prefetch(list(configured))
+        
+    # 检查各类彩票
+    for lottery_type, tickets in configured.items():
+        result = check_lottery(lottery_type, tickets, checker)
+        if result:
+            results.append({
+                'lottery_type': lottery_type,
+                'date': result['date'],
+                'winning_numbers': result['winning_numbers'],
+                'my_numbers': result['my_numbers'],
+                'prize_level': result['prize_level'],
+                'prize_amount': result['prize_amount'],
+                'tickets': result['tickets'],
+                'winners': result['winners']
+            })
 
     # 生成HTML报告
     html_report = generate_html_report(results)
+    METRICS.export()
 
     # 检查是否已经推送
     current_date = datetime.now().strftime('%Y-%m-%d')
 
-    # 在成功推送后更新最后推送日期
+    # 报告写入通知队列即视为已推送，实际推送与重试由队列负责
     try:
-        with open(JSON_FILE_NAME, 'r+', encoding='utf-8') as f:
-            data = json.load(f)
-            # 确保 `date_info` 存在
-            if 'date_info' not in data:
-                data['date_info'] = {'last_push_date': '0000-00-00'}
-            last_push_date = data['date_info'].get('last_push_date', '0000-00-00')
-
-            if last_push_date == current_date:
-                logger.info("今天已经推送过彩票检查报告，不再重复推送。")
-                return
-
-            QLAPI.notify("彩票检查报告", html_report)
+        data = state.load_json(JSON_FILE_NAME)
+        # 确保 `date_info` 存在
+        if 'date_info' not in data:
+            data['date_info'] = {'last_push_date': '0000-00-00'}
+        last_push_date = data['date_info'].get('last_push_date', '0000-00-00')
+
+        if last_push_date == current_date:
+            logger.info("今天已经推送过彩票检查报告，不再重复推送。")
+        elif SPOOL.put("彩票检查报告", html_report, source='lottery'):
             # 更新最后推送日期
             data['date_info']['last_push_date'] = current_date
-            f.seek(0)
-            json.dump(data, f, indent=2)
-            f.truncate()
-    except Exception as e:
-        logger.error(f"发送彩票检查报告失败: {str(e)}")
+            state.save_json(JSON_FILE_NAME, data, indent=2)
+    except (IOError, json.JSONDecodeError) as e:
+        logger.error(f"更新推送日期失败: {str(e)}")
+
+    SPOOL.flush()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='彩票检查')
+    parser.add_argument('--backfill', nargs='*', metavar='TYPE',
+                        help='回填开奖历史归档（ssq/3d/kl8），默认全部')
+    args = parser.parse_args()
+    if args.backfill is None:
+        run()
+        return
+
+    unknown = set(args.backfill) - set(LOTTERY_APIS)
+    if unknown:
+        parser.error(f'未知彩种: {", ".join(sorted(unknown))}')
+    checker = LotteryChecker()
+    for lottery_type in args.backfill or LOTTERY_APIS:
+        added = checker.backfill(lottery_type)
+        logger.info(f"{lottery_type.upper()}归档新增{added}期")
 
 
 if __name__ == "__main__":
-    run() 
+    main() 
     
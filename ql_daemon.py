@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+常驻进程模式：在同一进程内按各脚本头部的定时规则运行 PT、飞牛签到和彩票检查
+
+与 cron 逐次启动相比，requests 只导入一次，连接池（含飞牛各账号的会话）保持预热，
+首页缓存、熔断状态、签到/彩票记录（PT_attendance.json、FN_attendance.json、
+lottery_data.json）、.due 完成索引和运行指标留在内存中，
+每 QL_DAEMON_FLUSH 秒（默认300）及退出时写回文件。
+
+通知队列和开奖归档仍每次直接读写文件。
+
+用法：
+    python ql_daemon.py                 # 运行全部任务
+    python ql_daemon.py pt lottery      # 只运行指定任务
+    python ql_daemon.py --run-now       # 启动时先运行一次全部任务
+
+收到 SIGINT/SIGTERM 后等待当前任务结束，写回状态并关闭连接后退出。
+"""
+
+import argparse
+import datetime
+import heapq
+import importlib
+import itertools
+import logging
+import os
+import signal
+import threading
+import time
+
+from common import state
+from common.cron import CronExpr
+from common.http_pool import close_sessions
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+# 任务名 -> (模块, 入口函数)
+JOBS = {
+    'pt': ('PT_attendance', 'run'),
+    'fn': ('FN_attendance', 'main'),
+    'lottery': ('lottery_check', 'run'),
+}
+FLUSH_INTERVAL = max(1, int(os.getenv('QL_DAEMON_FLUSH', '300')))
+# 单次等待的上限，系统休眠或调整时钟后能及时重新计算
+MAX_SLEEP = 60
+
+
+class Scheduler:
+    """基于最小堆的定时调度器，任务在调度线程中依次执行"""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._stop = threading.Event()
+
+    def add(self, name, func, next_time, first=None):
+        """添加任务，next_time(now) 返回下次运行的时间戳"""
+        when = first if first is not None else next_time(time.time())
+        heapq.heappush(self._heap, (when, next(self._seq), name, func, next_time))
+        logger.info(f'{name}: 下次运行 {_format(when)}')
+
+    def stop(self, *args):
+        """请求退出，当前任务执行完后生效"""
+        self._stop.set()
+
+    def run_forever(self):
+        while self._heap and not self._stop.is_set():
+            when, _, name, func, next_time = self._heap[0]
+            wait = when - time.time()
+            if wait > 0:
+                self._stop.wait(min(wait, MAX_SLEEP))
+                continue
+
+            heapq.heappop(self._heap)
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                logger.error(f'{name}: 运行失败: {e}')
+            logger.debug(f'{name}: 耗时{time.perf_counter() - start:.3f}秒')
+
+            # 错过的触发点不补跑，从当前时间计算下一次
+            when = next_time(time.time())
+            heapq.heappush(self._heap, (when, next(self._seq), name, func, next_time))
+            logger.debug(f'{name}: 下次运行 {_format(when)}')
+
+
+def _format(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+def cron_schedule(cron):
+    """CronExpr 转为 next_time 函数"""
+    def next_time(now):
+        moment = cron.next_after(datetime.datetime.fromtimestamp(now))
+        return moment.timestamp()
+    return next_time
+
+
+def load_job(name):
+    """导入任务模块，返回（入口函数，定时规则）"""
+    module_name, entry = JOBS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, entry), CronExpr.from_script(module.__doc__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='青龙脚本常驻进程')
+    parser.add_argument('jobs', nargs='*', help=f'要运行的任务（{"/".join(JOBS)}），默认全部')
+    parser.add_argument('--run-now', action='store_true', help='启动时先运行一次')
+    args = parser.parse_args()
+    unknown = set(args.jobs) - set(JOBS)
+    if unknown:
+        parser.error(f'未知任务: {", ".join(sorted(unknown))}')
+
+    state.defer()
+    scheduler = Scheduler()
+    now = time.time()
+    for name in args.jobs or JOBS:
+        func, cron = load_job(name)
+        logger.info(f'{name}: 定时规则 {cron.expr}')
+        scheduler.add(name, func, cron_schedule(cron),
+                      first=now if args.run_now else None)
+    scheduler.add('state_flush', state.flush,
+                  lambda now: now + FLUSH_INTERVAL)
+
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    try:
+        scheduler.run_forever()
+    finally:
+        state.defer(False)
+        close_sessions()
+        logger.info('已退出')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+开奖历史归档：由模拟的 findDrawNotice 分页接口回填、每日追加、补缺与查询
+
+运行：python -m pytest tests
+"""
+
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lottery_check  # noqa: E402
+from common.draw_archive import DrawArchive, follows  # noqa: E402
+from common.prize_table import PrizeTable  # noqa: E402
+
+# 2024年150期、2025年40期，每天一期，2025001 为 2025-01-01
+ISSUES = [2024000 + i for i in range(1, 151)] + [2025000 + i for i in range(1, 41)]
+FIRST_DAY = date(2024, 8, 4)
+WEEKDAYS = '一二三四五六日'
+
+
+def notice(issue):
+    """一期快乐8开奖公告，号码由期号决定"""
+    day = FIRST_DAY + timedelta(days=issue_index(issue))
+    red = sorted(random.Random(issue).sample(range(1, 81), 20))
+    return {
+        'code': str(issue),
+        'date': f'{day.isoformat()}({WEEKDAYS[day.weekday()]})',
+        'red': ','.join(f'{n:02}' for n in red),
+        'blue': '',
+        'prizegrades': [
+            {'type': 'x1z1', 'typemoney': '4.6'},
+            {'type': 'x10z10', 'typemoney': '---'},
+            {'type': 'x10z9', 'typemoney': '8,000'},
+        ],
+    }
+
+
+def issue_index(issue):
+    year, sequence = divmod(issue, 1000)
+    return sequence - 1 if year == 2024 else 150 + sequence - 1
+
+
+class FakeResponse:
+    def __init__(self, results, failed):
+        self._results = results
+        self._failed = failed
+
+    def raise_for_status(self):
+        if self._failed:
+            raise IOError('500 Server Error')
+
+    def json(self):
+        return {'state': 0, 'result': self._results}
+
+
+class FakeSession:
+    """findDrawNotice 分页接口：按期号倒序分页，failed_pages 中的页返回500"""
+
+    def __init__(self, issues):
+        self.issues = issues
+        self.failed_pages = set()
+        self.pages = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        page_no, page_size = int(params['pageNo']), int(params['pageSize'])
+        self.pages.append(page_no)
+        newest = sorted(self.issues, reverse=True)
+        results = [notice(issue) for issue in newest[(page_no - 1) * page_size:page_no * page_size]]
+        return FakeResponse(results, page_no in self.failed_pages)
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(lottery_check, 'BACKFILL_INTERVAL', 0)
+    monkeypatch.setattr(lottery_check, 'BACKFILL_PAGE_SIZE', 7)
+    fake = FakeSession(list(ISSUES))
+    monkeypatch.setattr(lottery_check, 'get_session', lambda url: fake)
+    return fake
+
+
+@pytest.fixture
+def checker(session):
+    return lottery_check.LotteryChecker()
+
+
+def archived_issues():
+    archive = DrawArchive('kl8')
+    try:
+        return [archive[index].issue for index in range(len(archive))]
+    finally:
+        archive.close()
+
+
+def test_follows():
+    assert follows(2024149, 2024150)
+    assert follows(2024150, 2025001)
+    assert not follows(2024150, 2025002)
+    assert not follows(2025001, 2025003)
+
+
+def test_backfill_across_year(checker):
+    assert checker.backfill('kl8') == len(ISSUES)
+    assert archived_issues() == ISSUES
+
+    archive = DrawArchive('kl8')
+    assert archive.first_gap() is None
+    assert archive.by_issue(2025001).date == date(2025, 1, 1)
+    assert archive.by_issue(2024150).date == date(2024, 12, 31)
+    assert archive.by_date('2025-01-01').issue == 2025001
+    assert [draw.issue for draw in archive.between('2024-12-30', '2025-01-02')] == \
+        [2024149, 2024150, 2025001, 2025002]
+    archive.close()
+
+
+def test_failed_page_writes_nothing(checker, session):
+    session.failed_pages = {3}
+    assert checker.backfill('kl8') == 0
+    assert not DrawArchive('kl8').exists()
+
+    session.failed_pages = set()
+    assert checker.backfill('kl8') == len(ISSUES)
+
+    # 已有归档时中途失败同样不写入
+    session.issues += [2025041, 2025042]
+    session.failed_pages = {1}
+    assert checker.backfill('kl8') == 0
+    assert archived_issues() == ISSUES
+
+
+def test_backfill_stops_at_archive_tail(checker, session):
+    checker.backfill('kl8')
+    session.issues.append(2025041)
+    session.pages.clear()
+    assert checker.backfill('kl8') == 1
+    assert session.pages == [1]
+
+
+def test_missed_daily_draw(checker, session):
+    checker.backfill('kl8')
+    session.issues += [2025041, 2025042]
+
+    # 漏掉 2025041 后，2025042 不直接追加，避免留下缺口
+    lottery_check.LotteryChecker._archive_latest('kl8', notice(2025042))
+    assert archived_issues()[-1] == 2025040
+
+    assert checker.backfill('kl8') == 2
+    assert archived_issues() == session.issues
+
+    session.issues.append(2025043)
+    lottery_check.LotteryChecker._archive_latest('kl8', notice(2025043))
+    assert archived_issues()[-1] == 2025043
+
+
+def test_out_of_order_insert(session):
+    archive = DrawArchive('kl8')
+    assert archive.append([notice(issue) for issue in ISSUES if issue != 2024055]) == len(ISSUES) - 1
+    assert archive.first_gap() == 2024054
+
+    assert archive.append([notice(2024055)]) == 1
+    assert archive.append([notice(2024055)]) == 0
+    assert archive.first_gap() is None
+    assert [archive[index].issue for index in range(len(archive))] == ISSUES
+
+    # 插入的一期与其前后各期的号码、奖级都能正确读出
+    for issue in (2024054, 2024055, 2024056):
+        info = archive.to_info(archive.by_issue(issue))
+        assert info['red'] == notice(issue)['red']
+        assert len(info['prizegrades']) == 2
+    assert archive.by_date(archive.by_issue(2024055).date).issue == 2024055
+    archive.close()
+
+
+def test_backfill_eleven_issue_gap(checker, session):
+    missing = set(range(2024050, 2024061))
+    archive = DrawArchive('kl8')
+    archive.append([notice(issue) for issue in ISSUES if issue not in missing and issue <= 2025030])
+    assert len(missing) == 11
+    assert archive.first_gap() == 2024049
+    archive.close()
+
+    # 翻页到缺口之前为止，补齐缺口和末尾之后的开奖
+    assert checker.backfill('kl8') == 11 + 10
+    assert archived_issues() == ISSUES
+    assert DrawArchive('kl8').first_gap() is None
+
+
+def test_to_info_round_trip(checker):
+    checker.backfill('kl8')
+    archive = DrawArchive('kl8')
+    original = notice(2025040)
+    info = archive.to_info(archive.latest())
+    archive.close()
+
+    assert {key: info[key] for key in ('code', 'date', 'red', 'blue')} == \
+        {key: original[key] for key in ('code', 'date', 'red', 'blue')}
+    # 未公布的奖级不写入，4.6 元不取整
+    assert info['prizegrades'] == [
+        {'type': 'x1z1', 'typemoney': '4.6'},
+        {'type': 'x10z9', 'typemoney': '8000'},
+    ]
+
+    table = PrizeTable.for_draw('kl8', info)
+    assert table.kl8(1, 1) == 4.6
+    assert table.kl8(10, 9) == 8000
+    assert table.kl8(10, 10) == 0
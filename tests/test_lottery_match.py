@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+双色球复式/胆拖兑奖：组合数计算与逐注展开的结果一致
+
+快乐8票据的号码校验与固定奖金
+
+运行：python -m pytest tests
+"""
+
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.lottery_match import (  # noqa: E402
+    SSQ_TIERS, KL8Tickets, parse_ssq_compound, ssq_compound,
+)
+from common.prize_table import PrizeTable  # noqa: E402
+
+
+def expand(dan, tuo, blues, reds, blue):
+    """逐注展开后统计各奖级注数"""
+    reds = set(reds)
+    histogram = {}
+    for picked in itertools.combinations(tuo, 6 - len(dan)):
+        hits = len(reds.intersection(dan) | reds.intersection(picked))
+        for bet_blue in blues:
+            tier = SSQ_TIERS[hits * 2 + (bet_blue == blue)]
+            histogram[tier] = histogram.get(tier, 0) + 1
+    return histogram
+
+
+def random_bet(rng, dan_count, tuo_count, blue_count, hit_bias):
+    pool = rng.sample(range(1, 34), dan_count + tuo_count)
+    dan, tuo = pool[:dan_count], pool[dan_count:]
+    blues = rng.sample(range(1, 17), blue_count)
+    # 一半的开奖号码从所选红球中抽取，覆盖高奖级
+    reds = rng.sample(pool, 6) if hit_bias else rng.sample(range(1, 34), 6)
+    blue = rng.choice(blues) if hit_bias else rng.randint(1, 16)
+    return dan, tuo, blues, reds, blue
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_fushi_matches_expansion(seed):
+    rng = random.Random(seed)
+    bet = random_bet(rng, 0, rng.randint(6, 14), rng.randint(1, 4), seed % 2)
+    assert ssq_compound(*bet) == expand(*bet)
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_dantuo_matches_expansion(seed):
+    rng = random.Random(seed)
+    dan_count = rng.randint(1, 5)
+    tuo_count = rng.randint(6 - dan_count + 1, 14 - dan_count)
+    bet = random_bet(rng, dan_count, tuo_count, rng.randint(1, 4), seed % 2)
+    assert ssq_compound(*bet) == expand(*bet)
+
+
+def test_twenty_red_fushi():
+    reds = list(range(1, 21))
+    bet = ([], reds, [1, 2, 3], [1, 2, 3, 4, 21, 22], 2)
+    histogram = ssq_compound(*bet)
+    assert histogram == expand(*bet)
+    assert sum(histogram.values()) == 38760 * 3
+
+
+def test_parse_formats():
+    assert parse_ssq_compound('01,02,03,04,05,06,07+08,09') == \
+        ([], [1, 2, 3, 4, 5, 6, 7], [8, 9])
+    assert parse_ssq_compound('01,02#03,04,05,06,07+08') == \
+        ([1, 2], [3, 4, 5, 6, 7], [8])
+
+
+@pytest.mark.parametrize('text', [
+    '01,02,03,04,05,06,07',            # 缺少 +
+    '01,02,03,04,05+01',               # 红球不足6个
+    '01,02,03,04,05,06+',              # 没有蓝球
+    '#01,02,03,04,05,06+01',           # 有 # 但没有胆码
+    '01,02,03,04,05,06#07+01',         # 胆码超过5个
+    '01,02#02,03,04,05,06+01',         # 胆拖重复
+    '01,02,03,04,05,06+01,01',         # 蓝球重复
+    '01,02,03,04,05,34+01',            # 红球超出范围
+    '01,02,03,04,05,06+17',            # 蓝球超出范围
+    '01,02,03,04,05,xx+01',            # 非数字
+])
+def test_parse_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        parse_ssq_compound(text)
+
+
+@pytest.mark.parametrize('numbers', [
+    [],                                 # 没有号码
+    list(range(1, 12)),                 # 超过10个
+    [1, 2, 3, 3],                       # 号码重复
+    ['01', '1', '2'],                   # 补零后重复
+    [0, 1],                             # 超出范围
+    [80, 81],                           # 超出范围
+])
+def test_kl8_rejects_bad_ticket(numbers):
+    with pytest.raises(ValueError):
+        KL8Tickets().add(numbers)
+
+
+def test_kl8_picks_from_count():
+    book = KL8Tickets()
+    book.add(['01', '02', '03', '04', '05'])
+    result = book.match([str(n) for n in range(1, 21)])
+    assert result.histogram == {'选5中5': 1}
+
+
+@pytest.mark.parametrize('picks, money', [(10, 2), (9, 2), (8, 2), (7, 2)])
+def test_kl8_zero_hit_prize(picks, money):
+    assert PrizeTable.for_draw('kl8').kl8(picks, 0) == money